@@ -0,0 +1,181 @@
+"""
+Benchmark training time, inference throughput and peak memory of the tokenizers, and of the Trie and
+WordlistWrapper operations they build on, on synthetic wordlists of increasing size.
+
+Usage:
+    python benchmarks/run.py --sizes 1000 10000 100000 1000000 --tokenizers LSVTokenizer Morfessor
+    python benchmarks/run.py --memory --output results.jsonl
+
+The wordlists are generated with `morseg.utils.synthetic.zipf_wordlist`, so that results are reproducible
+without any external data. Peak memory is measured with tracemalloc in a separate run of each benchmark,
+because tracing slows down the code considerably.
+
+Tokenizers whose training time grows too fast are only benchmarked up to the sizes in `MAX_SIZES` (so that the
+default grid finishes, in an estimated half hour on one core); larger runs are reported as skipped. Use
+`--no-size-limits` to benchmark them anyway.
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from morseg.algorithms import tokenizer
+from morseg.algorithms.variety import PackedVarieties
+from morseg.datastruct import Trie
+from morseg.utils.synthetic import zipf_wordlist
+
+
+TOKENIZERS = [
+    "PairEncoding",
+    "WordPiece",
+    "UnigramSentencePiece",
+    "Morfessor",
+    "LSVTokenizer",
+    "LPVTokenizer",
+    "LSPVTokenizer",
+    "SquareEntropyTokenizer"
+]
+
+# the largest wordlists on which the tokenizers are trained by default. Training times on 10k words (one core):
+# PairEncoding and WordPiece 25s, UnigramSentencePiece 39s, Morfessor 37s; SquareEntropyTokenizer needs 150s
+# on 1k words already. LSV, LPV and LSPV need a few seconds and are not limited.
+MAX_SIZES = {
+    "PairEncoding": 100000,
+    "WordPiece": 100000,
+    "UnigramSentencePiece": 100000,
+    "Morfessor": 10000,
+    "SquareEntropyTokenizer": 1000
+}
+
+
+def measure(func, memory=False):
+    """
+    Run `func` and return its result, the wall-clock and CPU time, and (optionally) the peak memory in bytes
+    of a second, traced run.
+    """
+    gc.collect()
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = func()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return result, {"wall": wall, "cpu": cpu, "peak_memory": peak}
+
+
+def benchmark_datastructures(wl, memory=False):
+    trie, stats = measure(lambda: Trie(wl), memory=memory)
+    yield "Trie.insert_all", len(wl), stats
+
+    _, stats = measure(lambda: [trie.get_token_variety(word) for word in wl], memory=memory)
+    yield "Trie.get_token_variety", len(wl), stats
+
+    _, stats = measure(wl.copy, memory=memory)
+    yield "WordlistWrapper.copy", len(wl), stats
+
+    _, stats = measure(wl.bigram_counts, memory=memory)
+    yield "WordlistWrapper.bigram_counts", len(wl), stats
+
+    _, stats = measure(wl.f1_score, memory=memory)
+    yield "WordlistWrapper.f1_score", len(wl), stats
+
+
+def benchmark_tokenizer(name, wl, unseen, memory=False, size_limits=True):
+    if size_limits and len(wl) > MAX_SIZES.get(name, len(wl)):
+        yield f"{name}.train", len(wl), {"skipped": True}
+        return
+
+    model = getattr(tokenizer, name)()
+
+    _, stats = measure(lambda: model.train(wl), memory=memory)
+    stats["f1"] = model.forms.f1_score()[0]
+    yield f"{name}.train", len(wl), stats
+
+    for label, words in [("seen", wl), ("unseen", unseen)]:
+        words = [word.unsegmented for word in words]
+        _, stats = measure(lambda: list(model.tokenize_batch(words)), memory=memory)
+        yield f"{name}.tokenize_{label}", len(words), stats
+
+
+def benchmark_varieties(wl, memory=False):
+    """
+    Compare the "python" and "numpy" backends of LSVTokenizer on the computation of varieties and splits from the
+    token varieties of the training words (which are collected from the trie beforehand, for both backends).
+    """
+    model = tokenizer.LSVTokenizer()
+    model.train(wl)
+    token_varieties = model.token_varieties
+
+    for method in ["type", "entropy", "max_drop", "normalized"]:
+        for backend in ["python", "numpy"]:
+            model = tokenizer.LSVTokenizer(method=method, backend=backend)
+            model.token_varieties = token_varieties
+
+            def run():
+                if backend == "numpy":
+                    model.packed_varieties = PackedVarieties(list(token_varieties.values()))
+                if method == "normalized":
+                    model._calculate_exp_lsv()
+                model._calculate_varieties()
+                return model._get_splits()
+
+            _, stats = measure(run, memory=memory)
+            yield f"LSVTokenizer.varieties_{method}_{backend}", len(wl), stats
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+                        help="the numbers of words in the synthetic wordlists")
+    parser.add_argument("--tokenizers", nargs="*", default=TOKENIZERS, choices=TOKENIZERS,
+                        help="the tokenizers to benchmark (none to only benchmark the data structures)")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the wordlist generator")
+    parser.add_argument("--memory", action="store_true", help="also measure the peak memory of every benchmark")
+    parser.add_argument("--no-size-limits", dest="size_limits", action="store_false",
+                        help="train all tokenizers on all sizes, ignoring MAX_SIZES")
+    parser.add_argument("--output", help="append the results as JSON lines to this file")
+    args = parser.parse_args(args)
+
+    output = open(args.output, "a") if args.output else None
+    print(f"{'benchmark':<40}{'words':>10}{'wall (s)':>12}{'words/s':>14}{'peak (MB)':>12}")
+
+    try:
+        for size in args.sizes:
+            wl = zipf_wordlist(size, seed=args.seed)
+            # words that are not part of the training data, drawn from other morpheme inventories
+            unseen = zipf_wordlist(max(size // 10, 1), seed=args.seed + 1)
+
+            benchmarks = [benchmark_datastructures(wl, memory=args.memory)]
+            for name in args.tokenizers:
+                benchmarks.append(benchmark_tokenizer(name, wl, unseen, memory=args.memory,
+                                                      size_limits=args.size_limits))
+            if "LSVTokenizer" in args.tokenizers:
+                benchmarks.append(benchmark_varieties(wl, memory=args.memory))
+
+            for benchmark in benchmarks:
+                for name, num_words, stats in benchmark:
+                    stats.update(benchmark=name, size=size, words=num_words, seed=args.seed)
+                    if stats.get("skipped"):
+                        print(f"{name:<40}{num_words:>10}{'skipped':>12}")
+                    else:
+                        stats["throughput"] = num_words / stats["wall"] if stats["wall"] else None
+                        peak = f"{stats['peak_memory'] / 2 ** 20:.1f}" if stats["peak_memory"] is not None else "-"
+                        print(f"{name:<40}{num_words:>10}{stats['wall']:>12.3f}{stats['throughput']:>14.0f}{peak:>12}")
+
+                    if output:
+                        output.write(json.dumps(stats) + "\n")
+                        output.flush()
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from morseg.algorithms.search import grid, random_trials, run_search
+from morseg.algorithms.tokenizer import LSVTokenizer, LPVTokenizer, PairEncoding, WordPiece
+from morseg.utils.callbacks import EarlyStopping
+from morseg.utils.wrappers import WordlistWrapper
+from pathlib import Path
+
+
+wl = WordlistWrapper.from_file(Path(__file__).parent.parent / "eval" / "eval-data" / "latin-nelex.tsv")
+
+trials = []
+for model in [LSVTokenizer, LPVTokenizer]:
+    trials += grid(model, init_space={"method": ["type", "entropy", "max_drop"], "strategy": ["peak", "rise"]})
+trials += grid(PairEncoding, {"iterations": [100, 1000, 10000], "threshold": [0, 3]})
+trials += random_trials(WordPiece, {"iterations": lambda rng: rng.randint(100, 10000), "threshold": 0},
+                        num_trials=10)
+
+# trials are appended to search.jsonl as they finish; BPE and WordPiece runs stop once their F1 score stalls
+results = run_search(wl, trials, output="search.jsonl", n_jobs=-1, early_stopping=EarlyStopping(interval=50))
+
+for result in sorted(results, key=lambda result: result.f1 or 0, reverse=True)[:10]:
+    print(f"{result.tokenizer} {result.init_params} {result.train_params} ({result.status})")
+    print(f"F1: {result.f1}, PRECISION: {result.precision}, RECALL: {result.recall}\n")
@@ -0,0 +1,128 @@
+"""
+K-fold cross-validation of tokenizers: how well does a segmentation generalize to words that were not seen in
+training?
+"""
+import random
+from collections import namedtuple
+
+from linse.typedsequence import Word
+
+from morseg.utils.parallel import imap_chunks, set_worker_state, get_worker_state
+from morseg.utils.wrappers import WordlistWrapper
+
+
+Scores = namedtuple("Scores", ["f1", "precision", "recall"])
+FoldResult = namedtuple("FoldResult", ["fold", "scores", "train_size", "test_size", "model"])
+CrossValidationResult = namedtuple("CrossValidationResult", ["folds", "pooled", "mean", "std", "forms"])
+
+_STATE_KEYS = ["words", "tokenizer_cls", "tokenizer_kwargs", "train_kwargs", "return_models"]
+
+
+def k_fold_splits(num_words, k=5, seed=0):
+    """
+    Randomly partition the indices of `num_words` words into `k` folds of (almost) equal size.
+
+    :return: a list of (train indices, test indices) pairs, one per fold; every index occurs in exactly one
+        test fold.
+    """
+    if not 2 <= k <= num_words:
+        raise ValueError(f"Cannot split {num_words} words into {k} folds.")
+
+    indices = list(range(num_words))
+    random.Random(seed).shuffle(indices)
+    folds = [sorted(indices[i::k]) for i in range(k)]
+
+    return [(sorted(i for j, fold in enumerate(folds) if j != test for i in fold), folds[test])
+            for test in range(k)]
+
+
+def _cross_validate_chunk(chunk):
+    # the wordlist is set up once per worker, so only the indices of the folds are sent with every task
+    state = {key: get_worker_state(key) for key in _STATE_KEYS}
+    results = []
+
+    for fold, train_indices, test_indices in chunk:
+        model = state["tokenizer_cls"](**state["tokenizer_kwargs"])
+        model.train(WordlistWrapper([state["words"][i] for i in train_indices]), **state["train_kwargs"])
+
+        # segment the held-out words through the inference path, as unseen words
+        unsegmented = [state["words"][i].unsegmented for i in test_indices]
+        predictions = [Word([list(m) for m in segmentation]) if segmentation is not None else Word(word)
+                       for word, segmentation in zip(unsegmented, model.tokenize_batch(unsegmented))]
+        results.append((fold, predictions, model if state["return_models"] else None))
+
+    return results
+
+
+def _summarize(values):
+    mean = sum(values) / len(values)
+    std = (sum((value - mean) ** 2 for value in values) / (len(values) - 1)) ** 0.5 if len(values) > 1 else 0.0
+    return mean, std
+
+
+def cross_validate(
+        words: WordlistWrapper,
+        tokenizer_cls,
+        k=5,
+        tokenizer_kwargs=None,
+        seed=0,
+        n_jobs=1,
+        return_models=False,
+        **train_kwargs
+) -> CrossValidationResult:
+    """
+    Train a tokenizer on k-1 folds of a wordlist and segment the held-out fold, for each of the k folds.
+
+    Folds are trained in `n_jobs` worker processes. The wordlist is handed to every worker once, when it is
+    started (on platforms that fork, it is shared with the parent process instead of being copied), and
+    tasks only consist of the indices of the folds.
+
+    :param words: the wordlist, with gold segmentations.
+    :param tokenizer_cls: the tokenizer class, e.g. `Morfessor`.
+    :param k: the number of folds.
+    :param tokenizer_kwargs: keyword arguments for the constructor of the tokenizer.
+    :param seed: the seed for assigning words to folds.
+    :param n_jobs: the number of worker processes.
+    :param return_models: whether to send the trained models back from the workers.
+    :param train_kwargs: keyword arguments for `train`.
+    :return: a CrossValidationResult with the scores of every fold, the scores over all held-out words (pooled),
+        the mean and standard deviation of the fold scores, and the held-out segmentations of all words, in the
+        order of `words` (e.g. for `morseg.utils.evaluation.paired_test`).
+    """
+    splits = k_fold_splits(len(words), k=k, seed=seed)
+    state = {
+        "words": words,
+        "tokenizer_cls": tokenizer_cls,
+        "tokenizer_kwargs": tokenizer_kwargs or {},
+        "train_kwargs": train_kwargs,
+        "return_models": return_models
+    }
+
+    forms = [None] * len(words)
+    folds = []
+    tasks = [(fold, train_indices, test_indices) for fold, (train_indices, test_indices) in enumerate(splits)]
+
+    for chunk in imap_chunks(_cross_validate_chunk, tasks, n_jobs=n_jobs, chunk_size=1,
+                             initializer=set_worker_state, initargs=(state,)):
+        for fold, predictions, model in chunk:
+            train_indices, test_indices = splits[fold]
+            test_forms = []
+            for i, prediction in zip(test_indices, predictions):
+                form = words[i].copy()
+                form.update(prediction)
+                forms[i] = form
+                test_forms.append(form)
+
+            scores = Scores(*WordlistWrapper(test_forms).f1_score())
+            folds.append(FoldResult(fold, scores, len(train_indices), len(test_indices), model))
+
+    forms = WordlistWrapper(forms)
+    summaries = [_summarize([getattr(fold.scores, metric) for fold in folds]) for metric in Scores._fields]
+
+    return CrossValidationResult(
+        folds=folds,
+        pooled=Scores(*forms.f1_score()),
+        mean=Scores(*(mean for mean, _ in summaries)),
+        std=Scores(*(std for _, std in summaries)),
+        forms=forms
+    )
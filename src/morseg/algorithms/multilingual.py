@@ -0,0 +1,52 @@
+"""
+Training one tokenizer per language of a multilingual wordlist.
+"""
+from collections import namedtuple
+
+from morseg.utils.parallel import imap_chunks, set_worker_state, get_worker_state
+
+
+LanguageResult = namedtuple("LanguageResult", ["model", "f1", "precision", "recall"])
+
+
+def _train_languages_chunk(chunk):
+    tokenizer_cls = get_worker_state("tokenizer_cls")
+    tokenizer_kwargs = get_worker_state("tokenizer_kwargs")
+    train_kwargs = get_worker_state("train_kwargs")
+    results = []
+
+    for language, words in chunk:
+        model = tokenizer_cls(**tokenizer_kwargs)
+        model.train(words, **train_kwargs)
+        results.append((language, LanguageResult(model, *model.forms.f1_score())))
+
+    return results
+
+
+def train_per_language(wordlists: dict, tokenizer_cls, tokenizer_kwargs=None, n_jobs=1, **train_kwargs) -> dict:
+    """
+    Train a separate tokenizer on the wordlist of every language.
+
+    :param wordlists: a dictionary from languages to wordlists, as returned by
+        `WordlistWrapper.from_multilingual_file`.
+    :param tokenizer_cls: the tokenizer class, e.g. `Morfessor`.
+    :param tokenizer_kwargs: keyword arguments for the constructor of the tokenizer.
+    :param n_jobs: the number of worker processes; every language is trained in one process.
+    :param train_kwargs: keyword arguments for `train`.
+    :return: a dictionary from languages to LanguageResult tuples of the trained model and its F1 score, precision
+        and recall on the training forms, in the order of `wordlists`.
+    """
+    # start with the largest wordlists, so that no worker is left with a large language at the end
+    languages = sorted(wordlists, key=lambda language: len(wordlists[language]), reverse=True)
+    state = {
+        "tokenizer_cls": tokenizer_cls,
+        "tokenizer_kwargs": tokenizer_kwargs or {},
+        "train_kwargs": train_kwargs
+    }
+
+    results = {}
+    for chunk in imap_chunks(_train_languages_chunk, ((language, wordlists[language]) for language in languages),
+                             n_jobs=n_jobs, chunk_size=1, initializer=set_worker_state, initargs=(state,)):
+        results.update(chunk)
+
+    return {language: results[language] for language in wordlists}
@@ -0,0 +1,235 @@
+"""
+Batch computation of all pairwise word similarities and distances in a wordlist.
+
+Words are encoded as integer arrays, and the dynamic programming tables of many word pairs are filled at once,
+one cell at a time for all pairs. Within a block, pairs are grouped by length, so that the tables of short words
+are not padded to the length of the longest word, and the tables of one group never exceed `_MAX_CELLS` cells.
+Results are written to memory-mapped condensed arrays (in the order of
+`scipy.spatial.distance.squareform`), so that wordlists with tens of thousands of forms fit on disk rather than
+in memory.
+"""
+import math
+import os
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+from morseg.utils.parallel import imap_chunks, set_worker_state, get_worker_state
+
+
+PairwiseMatrices = namedtuple("PairwiseMatrices", ["khorsi", "ned", "sca_ned"])
+
+# the number of cells of the LCS tables that are filled at once
+_MAX_CELLS = 2 ** 24
+
+
+def encode(words, alphabet=None):
+    """
+    Encode a list of segment sequences as a zero-padded integer matrix. Segment ids start at 1.
+
+    :return: the matrix, the lengths of the words and the alphabet (a dictionary from segments to ids).
+    """
+    alphabet = {} if alphabet is None else alphabet
+    lengths = np.array([len(w) for w in words], dtype=np.int64)
+    matrix = np.zeros((len(words), lengths.max(initial=0)), dtype=np.int64)
+
+    for i, word in enumerate(words):
+        for j, segment in enumerate(word):
+            matrix[i, j] = alphabet.setdefault(segment, len(alphabet) + 1)
+
+    return matrix, lengths, alphabet
+
+
+def condensed_size(n):
+    return n * (n - 1) // 2
+
+
+def condensed_to_pairs(start, end, n):
+    """
+    Return the row and column indices of the entries [start, end) of a condensed n x n matrix.
+    """
+    rows = np.arange(n, dtype=np.int64)
+    offsets = rows * n - rows * (rows + 1) // 2
+    k = np.arange(start, end, dtype=np.int64)
+    i = np.searchsorted(offsets, k, side="right") - 1
+    j = k - offsets[i] + i + 1
+    return i, j
+
+
+def lcs_weights(a, la, b, lb, weights):
+    """
+    Sum the weights of the segments in the longest common subsequence of each pair of words.
+
+    The traceback follows `KhorsiSimilarity.lcs`: matching segments are taken from the end of both words,
+    otherwise the row is decremented if that keeps a longer common subsequence, and the column in all other cases.
+    """
+    num_pairs, max_len = a.shape[0], max(a.shape[1], b.shape[1])
+    table = np.zeros((num_pairs, a.shape[1] + 1, b.shape[1] + 1), dtype=np.int16 if max_len > 127 else np.int8)
+
+    for i in range(1, a.shape[1] + 1):
+        matches = b == a[:, i - 1:i]
+        for j in range(1, b.shape[1] + 1):
+            table[:, i, j] = np.where(
+                matches[:, j - 1],
+                table[:, i - 1, j - 1] + 1,
+                np.maximum(table[:, i - 1, j], table[:, i, j - 1])
+            )
+
+    pairs = np.arange(num_pairs)
+    i, j = la.copy(), lb.copy()
+    total = np.zeros(num_pairs)
+
+    active = (i > 0) & (j > 0)
+    while active.any():
+        seg_a = a[pairs, np.maximum(i - 1, 0)]
+        seg_b = b[pairs, np.maximum(j - 1, 0)]
+        match = active & (seg_a == seg_b)
+        up = active & ~match & (table[pairs, np.maximum(i - 1, 0), j] > table[pairs, i, np.maximum(j - 1, 0)])
+        left = active & ~match & ~up
+
+        total[match] += weights[seg_a[match]]
+        i -= match | up
+        j -= match | left
+        active = (i > 0) & (j > 0)
+
+    return total
+
+
+def normalized_edit_distance(a, la, b, lb):
+    """
+    Levenshtein distance of each pair of words, divided by the length of the longer word
+    (as `lingpy.align.pairwise.edit_dist` with `normalized=True`).
+    """
+    num_pairs = a.shape[0]
+    previous = np.tile(np.arange(b.shape[1] + 1), (num_pairs, 1))
+    distances = np.where(la == 0, lb, 0).astype(np.int64)
+
+    for i in range(1, a.shape[1] + 1):
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        substitution = b != a[:, i - 1:i]
+        for j in range(1, b.shape[1] + 1):
+            current[:, j] = np.minimum(
+                np.minimum(previous[:, j] + 1, current[:, j - 1] + 1),
+                previous[:, j - 1] + substitution[:, j - 1]
+            )
+        done = la == i
+        distances[done] = current[done, lb[done]]
+        previous = current
+
+    longest = np.maximum(np.maximum(la, lb), 1)
+    return distances / longest
+
+
+def _trim(matrix, lengths):
+    return matrix[:, :lengths.max(initial=0)]
+
+
+def _compute_blocks(blocks):
+    for start, end in blocks:
+        _compute_block(start, end, get_worker_state("state"))
+    return blocks
+
+
+def _length_batches(la, lb, max_cells=None):
+    """
+    Sort word pairs by the length of their longer word and split them into batches whose dynamic programming
+    tables have at most `max_cells` cells (but at least one pair).
+
+    :return: a list of index arrays.
+    """
+    max_cells = max_cells or _MAX_CELLS
+    order = np.argsort(np.maximum(la, lb), kind="stable")
+    cells = (np.maximum(la, lb)[order] + 1) ** 2
+
+    batches = []
+    start = 0
+    while start < len(order):
+        # the tables of a batch are as large as that of its last (longest) pair
+        candidates = cells[start:start + max(1, max_cells // int(cells[start]))]
+        sizes = np.arange(1, len(candidates) + 1) * candidates
+        end = start + max(1, int(np.searchsorted(sizes, max_cells, side="right")))
+        batches.append(order[start:end])
+        start = end
+
+    return batches
+
+
+def _compute_block(start, end, state):
+    i, j = condensed_to_pairs(start, end, len(state["lengths"]))
+    words, lengths = state["words"], state["lengths"]
+    names = list(state["paths"])
+    values = {name: np.empty(end - start) for name in names}
+
+    for batch in _length_batches(lengths[i], lengths[j]):
+        bi, bj = i[batch], j[batch]
+        la, lb = lengths[bi], lengths[bj]
+        a, b = _trim(words[bi], la), _trim(words[bj], lb)
+
+        shared = lcs_weights(a, la, b, lb, state["weights"])
+        values["khorsi"][batch] = 3 * shared - state["totals"][bi] - state["totals"][bj]
+        values["ned"][batch] = normalized_edit_distance(a, la, b, lb)
+
+        if "sca_ned" in values:
+            classes, class_lengths = state["classes"], state["class_lengths"]
+            ca, cb = class_lengths[bi], class_lengths[bj]
+            values["sca_ned"][batch] = normalized_edit_distance(_trim(classes[bi], ca), ca, _trim(classes[bj], cb), cb)
+
+    for name in names:
+        result = np.load(state["paths"][name], mmap_mode="r+")
+        result[start:end] = values[name]
+        result.flush()
+
+
+def pairwise_matrices(words, frequencies, out_dir=None, sound_classes=None, n_jobs=1, block_size=2 ** 14):
+    """
+    Compute Khorsi similarities and normalized edit distances for all pairs of words.
+
+    :param words: a list of segment sequences.
+    :param frequencies: a mapping from segments to their frequencies, as in `KhorsiSimilarity`.
+    :param out_dir: the directory for the memory-mapped result files (a temporary directory by default).
+    :param sound_classes: the name of a LingPy sound class model (e.g. "sca"); if given, edit distances are
+        computed for the sound class strings as well. This requires LingPy (`pip install morseg[lingpy]`).
+    :param n_jobs: the number of worker processes.
+    :param block_size: the number of word pairs that are handed to a worker at once. Their tables are filled in
+        smaller batches of pairs of similar length.
+    :return: a PairwiseMatrices tuple of condensed arrays (`sca_ned` is None without sound classes).
+    """
+    out_dir = out_dir or tempfile.mkdtemp(prefix="morseg-")
+    os.makedirs(out_dir, exist_ok=True)
+
+    encoded, lengths, alphabet = encode(words)
+
+    # the weight of a segment is its negative log probability
+    total = sum(frequencies.values())
+    weights = np.zeros(len(alphabet) + 1)
+    for segment, idx in alphabet.items():
+        weights[idx] = math.log(total / frequencies[segment])
+    totals = weights[encoded].sum(axis=1)
+
+    state = {"words": encoded, "lengths": lengths, "weights": weights, "totals": totals, "paths": {}}
+    names = ["khorsi", "ned"]
+
+    if sound_classes:
+        try:
+            from lingpy import tokens2class
+        except ImportError:
+            raise ValueError("You must install the lingpy software package to compute sound class distances "
+                             "(pip install morseg[lingpy])")
+        state["classes"], state["class_lengths"], _ = encode([tokens2class(list(w), sound_classes) for w in words])
+        names.append("sca_ned")
+
+    size = condensed_size(len(words))
+    for name in names:
+        path = os.path.join(out_dir, name + ".npy")
+        np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(size,)).flush()
+        state["paths"][name] = path
+
+    blocks = [(start, min(start + block_size, size)) for start in range(0, size, block_size)]
+    for _ in imap_chunks(_compute_blocks, blocks, n_jobs=n_jobs, chunk_size=1,
+                         initializer=set_worker_state, initargs=({"state": state},)):
+        pass
+
+    results = {name: np.load(path, mmap_mode="r") for name, path in state["paths"].items()}
+    return PairwiseMatrices(results["khorsi"], results["ned"], results.get("sca_ned"))
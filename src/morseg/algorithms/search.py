@@ -0,0 +1,165 @@
+"""
+Hyperparameter search over one or more tokenizers.
+
+A search consists of trials, each of which is a tokenizer class with constructor and training parameters. Trials
+are generated from parameter spaces (`grid` or `random_trials`) and trained by `run_search` in a pool of worker
+processes. Every finished trial is appended to a JSONL file right away, so that a long search can be monitored
+(and its results survive an interruption). With `early_stopping`, iterative tokenizers (PairEncoding, WordPiece,
+UnigramSentencePiece) abort hopeless trials based on the F1 scores in their intermediate `training_history`.
+
+Usage:
+>>> trials = grid(PairEncoding, {"iterations": [100, 500], "threshold": [0, 3]})
+>>> trials += grid(LSVTokenizer, init_space={"method": ["type", "entropy"], "strategy": ["peak", "rise"]})
+>>> trials += random_trials(WordPiece, {"iterations": lambda rng: rng.randint(10, 1000)}, num_trials=10)
+>>> results = run_search(wl, trials, output="search.jsonl", n_jobs=4, early_stopping=EarlyStopping(interval=20))
+>>> best = max(results, key=lambda result: result.f1)
+"""
+import copy
+import itertools
+import json
+import random
+import time
+from collections import namedtuple
+
+from morseg.utils.callbacks import StopTraining
+from morseg.utils.parallel import imap_chunks, set_worker_state, get_worker_state
+
+
+Trial = namedtuple("Trial", ["tokenizer_cls", "init_params", "train_params"])
+TrialResult = namedtuple(
+    "TrialResult",
+    ["trial", "tokenizer", "init_params", "train_params", "status", "f1", "precision", "recall", "iterations",
+     "wall", "error"]
+)
+
+# the status of a trial: trained to the end, aborted by early stopping, or failed with an exception
+COMPLETED, PRUNED, FAILED = "completed", "pruned", "failed"
+
+
+def _options(values):
+    return values if isinstance(values, (list, tuple, range)) else [values]
+
+
+def grid(tokenizer_cls, train_space=None, init_space=None):
+    """
+    Create a trial for every combination of parameter values.
+
+    :param tokenizer_cls: the tokenizer class.
+    :param train_space: a dictionary from training parameters to lists of values (single values are fixed).
+    :param init_space: the same for the parameters of the constructor of the tokenizer.
+    :return: a list of Trial tuples.
+    """
+    train_space, init_space = train_space or {}, init_space or {}
+    for space in (train_space, init_space):
+        if any(callable(values) for values in space.values()):
+            raise ValueError("A grid needs lists of values; use random_trials to sample values.")
+
+    init_grid = [dict(zip(init_space, values)) for values in itertools.product(*map(_options, init_space.values()))]
+    train_grid = [dict(zip(train_space, values)) for values in itertools.product(*map(_options, train_space.values()))]
+
+    return [Trial(tokenizer_cls, init_params, train_params)
+            for init_params in init_grid for train_params in train_grid]
+
+
+def random_trials(tokenizer_cls, train_space=None, init_space=None, num_trials=10, seed=0):
+    """
+    Create `num_trials` trials with randomly sampled parameter values.
+
+    :param train_space: a dictionary from training parameters to lists of values, which are drawn uniformly,
+        or to functions that draw a value from a `random.Random` object, e.g. `lambda rng: rng.uniform(0, 1)`.
+        Other values are fixed.
+    :param init_space: the same for the parameters of the constructor of the tokenizer.
+    :param seed: the seed for sampling.
+    """
+    rng = random.Random(seed)
+
+    def sample(space):
+        params = {}
+        for param, values in (space or {}).items():
+            if callable(values):
+                params[param] = values(rng)
+            else:
+                params[param] = rng.choice(_options(values))
+        return params
+
+    trials = []
+    for _ in range(num_trials):
+        init_params = sample(init_space)
+        trials.append(Trial(tokenizer_cls, init_params, sample(train_space)))
+
+    return trials
+
+
+def _run_trial(trial_id, trial, words, early_stopping):
+    params = dict(trial.train_params)
+    callbacks = list(params.pop("callbacks", None) or [])
+    if early_stopping is not None:
+        callbacks.append(copy.deepcopy(early_stopping))
+
+    if callbacks:
+        params["callbacks"] = callbacks
+
+    model = None
+    status, error, scores = COMPLETED, None, (None, None, None)
+    start = time.perf_counter()
+
+    try:
+        model = trial.tokenizer_cls(**trial.init_params)
+        model.train(words, **params)
+        scores = model.forms.f1_score()
+    except StopTraining as e:
+        status, error = PRUNED, str(e)
+        history = model.training_history
+        scores = (history["f1"][-1], history["precision"][-1], history["recall"][-1])
+    except Exception as e:
+        status, error = FAILED, f"{type(e).__name__}: {e}"
+
+    history = getattr(model, "training_history", None) or {}
+    iterations = max(history.get("f1_iteration", history.get("alphabet_size_iteration", [])), default=None)
+
+    return TrialResult(trial_id, trial.tokenizer_cls.__name__, trial.init_params, trial.train_params, status,
+                       *scores, iterations, time.perf_counter() - start, error)
+
+
+def _run_trials_chunk(chunk):
+    words, early_stopping = get_worker_state("words"), get_worker_state("early_stopping")
+    return [_run_trial(trial_id, trial, words, early_stopping) for trial_id, trial in chunk]
+
+
+def run_search(words, trials, output=None, n_jobs=1, early_stopping=None):
+    """
+    Train and evaluate all trials on a wordlist, distributed over `n_jobs` worker processes.
+
+    :param words: the wordlist, with gold segmentations. It is handed to every worker once, when it is started.
+    :param trials: a list of Trial tuples, e.g. from `grid` and `random_trials`.
+    :param output: a JSONL file to which every trial is appended as soon as it is done.
+    :param n_jobs: the number of worker processes.
+    :param early_stopping: an EarlyStopping callback (copied for every trial), to abort trials whose F1 score
+        stops improving or stays too low. It only affects tokenizers that train iteratively.
+    :return: a list of TrialResult tuples, in the order of `trials`. F1 score, precision and recall are measured
+        on the training forms; for pruned trials, they are the last scores in the training history.
+    """
+    results = [None] * len(trials)
+    f = open(output, "a") if output else None
+
+    try:
+        chunks = imap_chunks(
+            _run_trials_chunk,
+            enumerate(trials),
+            n_jobs=n_jobs,
+            chunk_size=1,
+            initializer=set_worker_state,
+            initargs=({"words": words, "early_stopping": early_stopping},),
+            ordered=False
+        )
+        for chunk in chunks:
+            for result in chunk:
+                results[result.trial] = result
+                if f:
+                    f.write(json.dumps(result._asdict(), default=str) + "\n")
+                    f.flush()
+    finally:
+        if f:
+            f.close()
+
+    return results
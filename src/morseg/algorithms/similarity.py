@@ -1,21 +1,34 @@
+import heapq
 import math
 from linse.typedsequence import Word, Morpheme
+from morseg.utils.parallel import imap_chunks, set_worker_state, get_worker_state
 from morseg.utils.wrappers import WordWrapper, WordlistWrapper
-from collections import defaultdict
+from collections import defaultdict, Counter
 
-from itertools import combinations
-from lingpy.align.pairwise import edit_dist
-from lingpy import tokens2class
-import matplotlib.pyplot as plt
+
+def _most_similar_chunk(words):
+    model, k = get_worker_state("model"), get_worker_state("k")
+    return [model._most_similar(word, k, exclude) for word, exclude in words]
 
 
 class KhorsiSimilarity(object):
     def __init__(self, wl : WordlistWrapper):
+        self.wl = wl
         self.frequencies = defaultdict(int)
         for w in wl:
             w = w.unsegmented[0]
             for segment in w:
                 self.frequencies[segment] += 1
+        self.total = sum(self.frequencies.values())
+        self._index = None
+
+    def weight(self, segment):
+        """
+        The information content of a segment, i.e. its negative log probability in the wordlist. Segments that
+        do not occur in the wordlist (in query words) are weighted as if they occurred once.
+        """
+        # `get`, so that looking up an unseen segment does not add it to the frequencies
+        return math.log(self.total / self.frequencies.get(segment, 1))
 
     @staticmethod
     def lcs(X, Y):
@@ -49,7 +62,51 @@ class KhorsiSimilarity(object):
                 i -= 1
                 j -= 1
 
-            elif X[i - 1] > Y[j - 1]:
+            elif L[i - 1][j] > L[i][j - 1]:
+                i -= 1
+            else:
+                j -= 1
+
+        return substring
+
+    @staticmethod
+    def lcs_bitparallel(X, Y):
+        """
+        Bit-parallel version of `lcs` (after Hyyrö 2004), which returns the same subsequence.
+
+        Every row of the DP table is encoded as a bitvector over the positions in Y, in which the zero bits mark
+        the positions where the LCS length increases. The rows are kept for the backtrack, so that
+        L[i][j] is the number of zero bits among the lowest j bits of row i.
+        """
+        n = len(Y)
+        ones = (1 << n) - 1
+
+        # bitmasks of the positions of every segment in Y
+        matches = {}
+        for j, segment in enumerate(Y):
+            matches[segment] = matches.get(segment, 0) | (1 << j)
+
+        rows = [ones]
+        v = ones
+        for segment in X:
+            u = v & matches.get(segment, 0)
+            v = ((v + u) | (v - u)) & ones
+            rows.append(v)
+
+        def length(i, j):
+            return j - bin(rows[i] & ((1 << j) - 1)).count("1")
+
+        substring = Morpheme()
+        i = len(X)
+        j = n
+
+        while i > 0 and j > 0:
+            if X[i - 1] == Y[j - 1]:
+                substring.insert(0, X[i - 1])
+                i -= 1
+                j -= 1
+
+            elif length(i - 1, j) > length(i, j - 1):
                 i -= 1
             else:
                 j -= 1
@@ -60,7 +117,7 @@ class KhorsiSimilarity(object):
         w1 = w1.unsegmented[0]
         w2 = w2.unsegmented[0]
 
-        substring = self.lcs(w1, w2)
+        substring = self.lcs_bitparallel(w1, w2)
 
         # get segments of the two words that are NOT part of the longest common substring
         w1_prime = Morpheme(w1)
@@ -70,11 +127,121 @@ class KhorsiSimilarity(object):
             w2_prime.remove(segment)
         subs_prime = w1_prime + w2_prime
 
-        return (sum([math.log(1 / self.frequencies[segment]) for segment in substring]) -
-                sum([math.log(1 / self.frequencies[segment]) for segment in subs_prime]))
+        return (sum([self.weight(segment) for segment in substring]) -
+                sum([self.weight(segment) for segment in subs_prime]))
+
+    def _get_index(self):
+        """
+        Build (once) an inverted index from segments to the words containing them, together with the total
+        weight of every word and the order of the words by their total weight.
+        """
+        if self._index is None:
+            postings = defaultdict(list)
+            totals = []
+            for idx, w in enumerate(self.wl):
+                w = w.unsegmented[0]
+                for segment, count in Counter(w).items():
+                    postings[segment].append((idx, count))
+                totals.append(sum(self.weight(segment) for segment in w))
+            order = sorted(range(len(totals)), key=lambda idx: (totals[idx], idx))
+            positions = {id(w): idx for idx, w in enumerate(self.wl)}
+            self._index = (dict(postings), totals, order, positions)
+
+        return self._index
+
+    def most_similar(self, word, k=10):
+        """
+        Find the k words in the wordlist that are most similar to the given word.
+
+        The common subsequence of two words is part of the segments they share, so `3 * shared - total(w1) -
+        total(w2)` bounds their similarity from above. Candidates are taken from the inverted index in order of
+        that bound, and exact similarities are only computed until no remaining candidate can enter the top k.
+        Words that share no segment with the given word have a similarity of `-total(w1) - total(w2)`, and are
+        considered in order of their total weight. The result is the same as ranking all words by similarity.
+
+        :param word: a WordWrapper; if it is part of the wordlist, it is not returned as its own neighbour.
+        :param k: the number of neighbours.
+        :return: a list of (WordWrapper, similarity) tuples, the most similar first.
+        """
+        return self._most_similar(word, k, self._get_index()[3].get(id(word)))
+
+    def _most_similar(self, word, k, exclude):
+        postings, totals, order, _ = self._get_index()
+        query = word.unsegmented[0]
+        query_total = sum(self.weight(segment) for segment in query)
+
+        shared = defaultdict(float)
+        for segment, count in Counter(query).items():
+            weight = self.weight(segment)
+            for idx, other_count in postings.get(segment, ()):
+                shared[idx] += weight * min(count, other_count)
+
+        # min-heap of (similarity, -index), so that ties are broken in favour of earlier words
+        top = []
+
+        def push(score, idx):
+            if len(top) < k:
+                heapq.heappush(top, (score, -idx))
+            elif (score, -idx) > top[0]:
+                heapq.heapreplace(top, (score, -idx))
+
+        def pruned(bound):
+            # allow for rounding differences between the bound and the exact similarity
+            return len(top) == k and bound + 1e-9 < top[0][0]
+
+        bounds = sorted(((3 * s - query_total - totals[idx], idx) for idx, s in shared.items()),
+                        key=lambda x: (-x[0], x[1]))
+        for bound, idx in bounds:
+            if pruned(bound):
+                break
+            if idx != exclude:
+                push(self.similarity(word, self.wl[idx]), idx)
+
+        for idx in order:
+            score = -query_total - totals[idx]
+            if pruned(score):
+                break
+            if idx not in shared and idx != exclude:
+                push(score, idx)
+
+        return [(self.wl[-idx], score) for score, idx in sorted(top, key=lambda x: (-x[0], -x[1]))]
+
+    def most_similar_batch(self, words, k=10, n_jobs=1, chunk_size=100):
+        """
+        Find the k most similar words for each of the given words, optionally in several processes.
+
+        :return: a list with the result of `most_similar` for every word.
+        """
+        positions = self._get_index()[3]
+        words = ((word, positions.get(id(word))) for word in words)
+
+        results = []
+        for chunk in imap_chunks(_most_similar_chunk, words, n_jobs=n_jobs, chunk_size=chunk_size,
+                                 initializer=set_worker_state, initargs=({"model": self, "k": k},)):
+            results.extend(chunk)
+
+        return results
+
+    def pairwise(self, out_dir=None, sound_classes=None, n_jobs=1, block_size=2 ** 14):
+        """
+        Compute Khorsi similarities, normalized edit distances and (with `sound_classes`, e.g. "sca", which
+        requires LingPy) normalized edit distances of the sound class strings for all pairs of words in the
+        wordlist, as memory-mapped condensed arrays.
+        See `morseg.algorithms.pairwise.pairwise_matrices` for details.
+        """
+        from morseg.algorithms.pairwise import pairwise_matrices
+
+        words = [w.unsegmented[0] for w in self.wl]
+        return pairwise_matrices(words, self.frequencies, out_dir=out_dir, sound_classes=sound_classes,
+                                 n_jobs=n_jobs, block_size=block_size)
 
 
 if __name__ == "__main__":
+    from itertools import combinations
+    from lingpy.align.pairwise import edit_dist
+    from lingpy import tokens2class
+    import matplotlib.pyplot as plt
+
     wl = WordlistWrapper.from_file("../../../eval/eval-data/latin-nelex.tsv")
     # wl = WordlistWrapper.from_file("../../../eval/eval-data/lati1261.tsv")
     khorsi = KhorsiSimilarity(wl)
@@ -0,0 +1,86 @@
+"""
+Parameter sweeps that share the expensive precomputation between model configurations.
+"""
+from collections import namedtuple
+
+from morseg.algorithms.tokenizer import LSVTokenizer, LPVTokenizer, LSPVTokenizer
+from morseg.utils.wrappers import WordlistWrapper
+
+
+SweepResult = namedtuple(
+    "SweepResult",
+    ["model", "method", "strategy", "threshold", "forms", "f1", "precision", "recall"]
+)
+
+
+def sweep_lsv(words: WordlistWrapper, methods=None, strategies=None, thresholds=(), backend="python"):
+    """
+    Segment a wordlist with LSV, LPV and LSPV for every combination of variety measure and split strategy.
+
+    The forward and backward tries and the token varieties are built only once, and every variety measure is
+    computed once per direction, so that a full sweep costs about as much as training a single LSPV model.
+    The "threshold" strategy is evaluated once for every value in `thresholds`; the "subword" strategy does
+    not depend on the variety measure and is therefore evaluated once, with `method` set to None.
+
+    :param words: the wordlist to segment.
+    :param methods: the variety measures to evaluate (default: all of them).
+    :param strategies: the split strategies to evaluate (default: all of them).
+    :param thresholds: the thresholds for the "threshold" strategy.
+    :param backend: "python", or "numpy" for the vectorized computation of varieties and splits.
+    :return: a list of SweepResult tuples, holding the segmented forms and their scores.
+    """
+    methods = methods or LSVTokenizer.param_options["method"]
+    strategies = strategies or LSVTokenizer.param_options["strategy"]
+
+    for param, values, options in [("method", methods, LSVTokenizer.param_options["method"]),
+                                   ("strategy", strategies, LSVTokenizer.param_options["strategy"])]:
+        for value in values:
+            if value not in options:
+                raise ValueError(f"Invalid value for argument {param}: '{value}'")
+
+    if "threshold" in strategies and not thresholds:
+        raise ValueError("Thresholds are required for the threshold segmentation strategy.")
+
+    # set up the shared state once per direction; the training forms are only read
+    lsv, lpv = LSVTokenizer(backend=backend), LPVTokenizer(backend=backend)
+    for model in (lsv, lpv):
+        model.forms = words
+        model._preprocess()
+        model._prepare_token_varieties()
+        if "normalized" in methods:
+            model._calculate_exp_lsv()
+
+    lspv = LSPVTokenizer(lsv=lsv, lpv=lpv)
+    results = []
+
+    for i, method in enumerate(methods):
+        for model in (lsv, lpv):
+            model.params["method"] = method
+            model._calculate_varieties()
+
+        for strategy in strategies:
+            if strategy == "subword" and i > 0:
+                continue
+
+            for threshold in (thresholds if strategy == "threshold" else [None]):
+                for model in (lsv, lpv):
+                    model.params.update(method=method, strategy=strategy, threshold=threshold)
+                for model in (lsv, lpv, lspv):
+                    model.forms = words.copy()
+
+                # LSPV combines the splits of both directions
+                lsv._postprocess()
+                lpv._postprocess()
+                lspv._postprocess()
+
+                for name, model in [("LSV", lsv), ("LPV", lpv), ("LSPV", lspv)]:
+                    results.append(SweepResult(
+                        name,
+                        None if strategy == "subword" else method,
+                        strategy,
+                        threshold,
+                        model.forms,
+                        *model.forms.f1_score()
+                    ))
+
+    return results
@@ -1,27 +1,99 @@
 """
 Tokenizers are methods that work with pure wordlists.
 """
+import gzip
+import json
 import math
+import os
 
-from typing import List
+from typing import Iterable, List
 import random
 from linse.typedsequence import Word, Morpheme
-from morseg.utils.wrappers import WordWrapper, WordlistWrapper
-from morseg.datastruct import Trie
-from tqdm import tqdm
+from morseg.utils.wrappers import WordWrapper, WordlistWrapper, Form, form_key
+from morseg.utils.parallel import imap_chunks, resolve_n_jobs, set_worker_state, get_worker_state, ShardedWorkers
+from morseg.utils.instrumentation import TrainingStats
+from morseg.utils.callbacks import get_callbacks
+from morseg.utils.checkpoint import Checkpointer, load_checkpoint
+from morseg.datastruct import Trie, LRUCache
 
 import collections
+import contextlib
+import copy
+import functools
 
-try:
-    import morfessor
-except ImportError:
-    morfessor = False
+
+_MISSING = object()
+
+
+def _progress(iterable):
+    # tqdm and morfessor are imported on first use, to keep importing this module cheap
+    from tqdm import tqdm
+    return tqdm(iterable)
+
+
+def _import_morfessor():
+    try:
+        import morfessor
+    except ImportError:
+        raise ValueError("You must install the morfessor software package")
+    return morfessor
+
+# version of the file format written by `Tokenizer.save`
+FORMAT_VERSION = 1
+# version of the training checkpoints, which change with the training state independently of the file format
+CHECKPOINT_VERSION = 1
+
+
+def _tokenize_chunk(chunk):
+    tokenizer = get_worker_state("tokenizer")
+    kwargs = get_worker_state("kwargs")
+    return [tokenizer(word, **kwargs) for word in chunk]
+
+
+def _train_on_shared_forms(chunk):
+    # the forms are inherited from the parent process and only read (every model segments a copy-on-write copy);
+    # the trained model is sent back without its forms
+    forms = get_worker_state("forms")
+    results = []
+
+    for model in chunk:
+        model.train(forms)
+        splits = [form.get_splits() for form in model.forms]
+        model.forms = None
+        results.append((model, splits))
+
+    return results
 
 
 class Tokenizer:
 
     def __init__(self, **kwargs):
         self.kwargs = kwargs
+        self.cache = None
+        self.training_stats = None
+        self._checkpointer = None
+        self._callbacks = []
+        self._start_iteration = 0
+        self._converged = False
+
+    def enable_cache(self, maxsize=1024):
+        """
+        Memoize the segmentations returned by `__call__` in a size-bounded LRU cache, keyed on the unsegmented form.
+        Cached segmentations are returned as immutable tuples of morpheme tuples. Calls with additional keyword
+        arguments bypass the cache.
+        """
+        self.cache = LRUCache(maxsize=maxsize)
+
+    def disable_cache(self):
+        self.cache = None
+
+    def cache_info(self):
+        """
+        Return hit, miss and eviction counters of the segmentation cache, or None if caching is disabled.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.info()
 
     def _copy_forms(self, words: WordlistWrapper):
         self.forms = words.copy()
@@ -38,30 +110,353 @@ class Tokenizer:
     def train(
             self,
             words: WordlistWrapper,
+            instrument=False,
+            checkpoint_dir=None,
+            checkpoint_interval=None,
+            checkpoint_seconds=None,
+            resume_from=None,
             **kwargs):
-        self._copy_forms(words)
-        self._preprocess(**kwargs)
-        self._train(**kwargs)
-        self._postprocess()
+        """
+        Train the model on a (copy-on-write) copy of a wordlist. With `instrument=True` (or a `TrainingStats`
+        object, to configure the measurements), time and memory of every training phase are recorded in
+        `training_stats`.
+
+        The iterative models (PairEncoding, WordPiece, UnigramSentencePiece) can write checkpoints of their
+        training state to `checkpoint_dir`, every `checkpoint_interval` iterations and/or every
+        `checkpoint_seconds` seconds, and when training ends. `resume_from` (a checkpoint directory or file)
+        continues an interrupted run exactly as it would have continued; the training forms and keyword
+        arguments are then taken from the checkpoint, and the keyword arguments passed here override them.
+        Other models raise a ValueError if any of these arguments is given.
+        """
+        checkpoint_args = [checkpoint_dir, checkpoint_interval, checkpoint_seconds, resume_from]
+        if any(arg is not None for arg in checkpoint_args) and not self._supports_checkpoints():
+            raise ValueError(f"{type(self).__name__} does not support checkpoints.")
+
+        if self.cache is not None:
+            self.cache.clear()
+        if instrument:
+            self.training_stats = instrument if isinstance(instrument, TrainingStats) else TrainingStats()
+        else:
+            self.training_stats = None
+
+        self._checkpointer = None
+        if checkpoint_dir is not None:
+            self._checkpointer = Checkpointer(checkpoint_dir, interval=checkpoint_interval,
+                                              seconds=checkpoint_seconds)
+
+        if resume_from is not None:
+            with self._phase("resume"):
+                kwargs = self._resume(resume_from, kwargs)
+        else:
+            self._start_iteration = 0
+            self._converged = False
+            with self._phase("copy_forms"):
+                self._copy_forms(words)
+            with self._phase("preprocess"):
+                self._preprocess(**kwargs)
+
+        # the callbacks are not part of the training state
+        self._train_kwargs = {key: value for key, value in kwargs.items() if key != "callbacks"}
+
+        self._callbacks = []
+        try:
+            with self._phase("train"):
+                self._train(**kwargs)
+        finally:
+            # release the resources of the callbacks also when training is aborted (e.g. by StopTraining)
+            for callback in self._callbacks:
+                callback.close()
+            self._callbacks = []
+        with self._phase("postprocess"):
+            self._postprocess()
+
+    def _phase(self, name):
+        if self.training_stats is None:
+            return contextlib.nullcontext()
+        return self.training_stats.phase(name)
+
+    def _iteration(self, **counts):
+        """
+        Record the end of a training iteration, with the number of items it processed (if instrumented).
+        """
+        if self.training_stats is not None:
+            self.training_stats.iteration(**counts)
+
+    def _iterations(self, num_iterations):
+        """
+        The numbers (counting from 1) of the iterations that are left to run, after a resumed checkpoint.
+        """
+        if self._converged:
+            return range(0)
+        return _progress(range(self._start_iteration + 1, num_iterations + 1))
+
+    def _checkpoint(self, iteration, converged=False, force=False):
+        """
+        Write a checkpoint after `iteration` completed iterations, if one is due, if training has converged
+        (so that a resumed run stops as well) or if forced (after the last iteration).
+        """
+        if self._checkpointer is None or not (converged or force or self._checkpointer.due(iteration)):
+            return
+
+        self._checkpointer.write({
+            "tokenizer": type(self).__name__,
+            "version": CHECKPOINT_VERSION,
+            "iteration": iteration,
+            "converged": converged,
+            "kwargs": self._train_kwargs,
+            "forms": self.forms,
+            "state": self._get_training_state(),
+            "training_history": getattr(self, "training_history", None),
+            "random_state": random.getstate()
+        })
+
+    def _resume(self, path, kwargs):
+        checkpoint = load_checkpoint(path)
+        if checkpoint.get("tokenizer") != type(self).__name__:
+            raise ValueError(f"{path} does not contain a checkpoint of a {type(self).__name__}.")
+        if checkpoint.get("version", 0) != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} contains a checkpoint of an incompatible version ({checkpoint.get('version')}).")
+
+        self.forms = checkpoint["forms"]
+        self.training_data = self.forms
+        self._set_training_state(checkpoint["state"])
+        self._start_iteration = checkpoint["iteration"]
+        self._converged = checkpoint["converged"]
+        self.training_history = checkpoint["training_history"]
+        random.setstate(checkpoint["random_state"])
+
+        return {**checkpoint["kwargs"], **kwargs}
+
+    @classmethod
+    def _supports_checkpoints(cls):
+        return cls._get_training_state is not Tokenizer._get_training_state
+
+    def _get_training_state(self):
+        """
+        Return the state of an iterative training run, apart from the training forms, for checkpoints.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpoints.")
+
+    def _set_training_state(self, state):
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpoints.")
+
+    def _begin_callbacks(self, callbacks):
+        """
+        Set up the callbacks of an iterative training run (see `morseg.utils.callbacks`).
+        """
+        callbacks = get_callbacks(callbacks)
+        # a resumed run continues the training history of its checkpoint
+        if callbacks and (self._start_iteration == 0 or getattr(self, "training_history", None) is None):
+            self.training_history = collections.defaultdict(list)
+        # registered before they are set up, so that `train` closes them if setting up a callback fails
+        self._callbacks = callbacks
+        for callback in callbacks:
+            callback.on_train_begin(self)
+        return callbacks
+
+    def _snapshot(self, forms):
+        """
+        Return copies of the given training forms, segmented as the model currently segments them.
+        """
+        return [form.copy() for form in forms]
 
     def _tokenize(self, word, **kwargs):
-        return self.forms[word]
+        form = self.forms[word]
+        if form is None:
+            return self._segment(word)
+        return form
+
+    def _segment(self, word):
+        """
+        Segment a word that is not part of the training data. Returns None if the model cannot segment unseen words.
+        """
+        return None
 
     def __call__(self, word: Word, **kwargs) -> Word:
-        return self._tokenize(word, **kwargs)
+        """
+        Segment a word. Without a cache, the result is a Word (for a training form, its WordWrapper). With a
+        cache (see `enable_cache`), the result is an immutable tuple of morphemes, each a tuple of segments, which
+        is shared between calls; convert it with `Word([list(m) for m in result])` if a Word is needed.
+        Returns None if the model cannot segment the word.
+        """
+        if self.cache is None or kwargs:
+            return self._tokenize(word, **kwargs)
+
+        key = form_key(word)
+        segmented = self.cache.get(key, _MISSING)
+        if segmented is _MISSING:
+            segmented = self._tokenize(word)
+            if segmented is not None:
+                segmented = tuple(tuple(m) for m in segmented)
+            self.cache[key] = segmented
+
+        return segmented
 
     def tokenize(
             self,
             words: List[Word],
             **kwargs
     ):
+        """
+        Segment words one by one. The results have the same types as those of `__call__`: Words, or tuples of
+        morpheme tuples if the cache is enabled.
+        """
         for word in words:
             yield self(word, **kwargs)
 
+    def tokenize_batch(
+            self,
+            words: Iterable[Word],
+            n_jobs=1,
+            chunk_size=1000,
+            **kwargs
+    ):
+        """
+        Segment an iterable of words in chunks of `chunk_size`, distributed over `n_jobs` worker processes.
+        Segmentations are yielded in input order as soon as their chunk is done; only a bounded number of chunks
+        is held in memory at any time, so the input can be an arbitrarily long stream.
+        """
+        chunks = imap_chunks(
+            _tokenize_chunk,
+            words,
+            n_jobs=n_jobs,
+            chunk_size=chunk_size,
+            initializer=set_worker_state,
+            initargs=({"tokenizer": self, "kwargs": kwargs},)
+        )
+        for chunk in chunks:
+            yield from chunk
+
     def get_segmentations(self):
         for form in self.forms:
             yield form
 
+    def _get_state(self):
+        """
+        Return everything the trained model needs for inference as a JSON-serializable dictionary.
+        """
+        return {}
+
+    def _set_state(self, state):
+        pass
+
+    def save(self, path):
+        """
+        Store the trained model in a versioned JSON file, which is gzip-compressed if the path ends with '.gz'.
+        Only the parameters needed for inference are stored, not the training data.
+        """
+        data = {
+            "format": "morseg-tokenizer",
+            "version": FORMAT_VERSION,
+            "tokenizer": type(self).__name__,
+            "kwargs": self.kwargs,
+            "state": self._get_state()
+        }
+        with _open(path, "wt") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a model that was stored with `save`. The returned model segments words through `__call__`,
+        but holds no training forms.
+        """
+        with _open(path, "rt") as f:
+            data = json.load(f)
+
+        if data.get("format") != "morseg-tokenizer":
+            raise ValueError(f"{path} does not contain a stored tokenizer.")
+        if data["version"] > FORMAT_VERSION:
+            raise ValueError(f"{path} was written by a newer version of morseg (format version {data['version']}).")
+
+        tokenizer_cls = _get_tokenizer_class(data["tokenizer"])
+        if not issubclass(tokenizer_cls, cls):
+            raise ValueError(f"{path} contains a {tokenizer_cls.__name__}, not a {cls.__name__}.")
+
+        tokenizer = tokenizer_cls(**data["kwargs"])
+        tokenizer.forms = WordlistWrapper([])
+        tokenizer._set_state(data["state"])
+
+        return tokenizer
+
+
+def _open(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _get_tokenizer_class(name):
+    classes = [Tokenizer]
+    while classes:
+        tokenizer_cls = classes.pop()
+        if tokenizer_cls.__name__ == name:
+            return tokenizer_cls
+        classes.extend(tokenizer_cls.__subclasses__())
+
+    raise ValueError(f"Unknown tokenizer: {name}")
+
+
+def _unsegmented(word) -> WordWrapper:
+    """
+    Wrap the unsegmented form of a (possibly segmented) word.
+    """
+    return WordWrapper([list(form_key(word))])
+
+
+def _apply_merges(segments, merges, wp_token=None):
+    """
+    Replay a list of merges on a sequence of segments, exactly as `WordlistWrapper.merge` applies them during
+    training. Returns the segmentation as a list of morpheme tuples.
+    """
+    word = _start_merges(segments, wp_token=wp_token)
+    _replay_merges([word], merges, wp_token=wp_token)
+    return _finish_merges(word, wp_token=wp_token)
+
+
+def _start_merges(segments, wp_token=None):
+    word = [(s,) for s in segments]
+    if wp_token:
+        word = word[:1] + [(wp_token,) + m for m in word[1:]]
+    return word
+
+
+def _replay_merges(words, merges, wp_token=None):
+    # modifies the words (lists of morpheme tuples) in place
+    for left, right in merges:
+        merged = left + _remove_first(right, wp_token)
+        for word in words:
+            i = 0
+            while i < len(word) - 1:
+                if word[i] == left and word[i + 1] == right:
+                    word[i:i + 2] = [merged]
+                i += 1
+
+
+def _finish_merges(word, wp_token=None):
+    if wp_token:
+        word = word[:1] + [_remove_first(m, wp_token) for m in word[1:]]
+    return word
+
+
+def _remove_first(morpheme: tuple, token):
+    if token and token in morpheme:
+        idx = morpheme.index(token)
+        return morpheme[:idx] + morpheme[idx + 1:]
+    return morpheme
+
+
+def _merge_and_count_pairs(words, message):
+    # a shard of words (lists of morpheme tuples) catches up with the merges learned since the last count
+    merges, wp_token = message
+    _replay_merges(words, merges, wp_token=wp_token)
+
+    counts = {}
+    for word in words:
+        for pair in zip(word, word[1:]):
+            counts[pair] = counts.get(pair, 0) + 1
+    return counts
+
 
 class RandomTokenizer(Tokenizer):
     """
@@ -96,7 +491,114 @@ class RandomTokenizer(Tokenizer):
         return out
 
 
-class PairEncoding(Tokenizer):
+TrajectoryPoint = collections.namedtuple(
+    "TrajectoryPoint",
+    ["num_merges", "alphabet_size", "forms", "f1", "precision", "recall"]
+)
+
+
+class MergeTokenizer(Tokenizer):
+    """
+    Base class for tokenizers that learn a ranked list of merges (PairEncoding, WordPiece). Since a model after
+    k merges is the same as a model trained for k iterations, one long training run yields the models for all
+    smaller numbers of merges.
+    """
+    wp_prefix = None
+
+    def num_merges_for_vocab_size(self, vocab_size):
+        """
+        Return the number of merges after which training with `vocab_size` would have stopped, or None if that
+        alphabet size was never reached.
+        """
+        for i, alphabet_size in enumerate(self.alphabet_sizes):
+            if alphabet_size == vocab_size:
+                return i + 1
+        return None
+
+    def trajectory(self, merge_counts=None, vocab_sizes=()):
+        """
+        Materialize the segmentations of the training forms after each of the given numbers of merges, or at
+        each of the given vocabulary sizes, by replaying the learned merges once.
+
+        :param merge_counts: the numbers of merges (by default, every number up to the number of learned merges).
+        :param vocab_sizes: alphabet sizes, which are translated into numbers of merges (see
+            `num_merges_for_vocab_size`); sizes that were never reached are skipped.
+        :return: a list of TrajectoryPoint tuples, ordered by the number of merges.
+        """
+        if merge_counts is None and not vocab_sizes:
+            merge_counts = range(len(self.merges) + 1)
+        counts = set(merge_counts or ())
+        counts.update(self.num_merges_for_vocab_size(size) for size in vocab_sizes)
+        counts.discard(None)
+
+        for count in counts:
+            if not 0 <= count <= len(self.merges):
+                raise ValueError(f"The model has learned {len(self.merges)} merges, not {count}.")
+
+        words = [_start_merges(form.unsegmented.key, wp_token=self.wp_prefix) for form in self.forms]
+        points = []
+        done = 0
+
+        for count in sorted(counts):
+            _replay_merges(words, self.merges[done:count], wp_token=self.wp_prefix)
+            done = count
+
+            forms = self.forms.copy()
+            for form, word in zip(forms, words):
+                form.update(Word([list(m) for m in _finish_merges(word, wp_token=self.wp_prefix)]))
+
+            alphabet_size = self.alphabet_sizes[count - 1] if count > 0 else len(forms.unigram_counts())
+            points.append(TrajectoryPoint(count, alphabet_size, forms, *forms.f1_score()))
+
+        return points
+
+    def at_merges(self, num_merges) -> TrajectoryPoint:
+        """
+        Return the segmentations of the training forms after the first `num_merges` merges.
+        """
+        return self.trajectory([num_merges])[0]
+
+    @contextlib.contextmanager
+    def _pair_counter(self, n_jobs=1, wp_token=None):
+        """
+        Yield a function that counts the pairs of adjacent morphemes in the training forms, as
+        `WordlistWrapper.bigram_counts` does. With `n_jobs > 1`, the forms are split into shards once per
+        training run, which are held by worker processes (see `ShardedWorkers`). Before every count, only the
+        merges learned since the last count are sent to the workers, which apply them to their shards.
+        """
+        n_jobs = resolve_n_jobs(n_jobs)
+        if n_jobs == 1:
+            yield self.training_data.bigram_counts
+            return
+
+        words = [[tuple(m) for m in form] for form in self.training_data]
+        size = max(-(-len(words) // n_jobs), 1)
+        shards = [words[i:i + size] for i in range(0, len(words), size)]
+        morphemes = {}
+        done = len(self.merges)
+
+        def morpheme(m):
+            if m not in morphemes:
+                morphemes[m] = Morpheme(list(m))
+            return morphemes[m]
+
+        def count_pairs():
+            nonlocal done
+            partials = workers.map((self.merges[done:], wp_token))
+            done = len(self.merges)
+
+            # the shards are consecutive, so the pairs keep the order of their first occurrence
+            counts = collections.defaultdict(int)
+            for partial in partials:
+                for (left, right), count in partial.items():
+                    counts[morpheme(left), morpheme(right)] += count
+            return counts
+
+        with ShardedWorkers(_merge_and_count_pairs, shards) as workers:
+            yield count_pairs
+
+
+class PairEncoding(MergeTokenizer):
     """
 
     Notes
@@ -115,137 +617,239 @@ class PairEncoding(Tokenizer):
             self,
             iterations=60,
             threshold=3,
+            n_jobs=1,
             **kwargs
     ):
-        callbacks = kwargs.get("callbacks")
-        if callbacks:
-            self.training_history = collections.defaultdict(list)
+        """
+        Merge the most frequent pair of adjacent subwords `iterations` times, or until its frequency falls below
+        `threshold`. With `n_jobs > 1`, the pairs are counted in shards, which are held by worker processes for the
+        whole training run (see `MergeTokenizer._pair_counter`); this only pays off for very large wordlists.
+        """
+        callbacks = self._begin_callbacks(kwargs.get("callbacks"))
+        if self._start_iteration == 0:
+            self.merges = []
+            self.alphabet_sizes = []
+        logs = {}
 
         # merge most frequent bigram
-        for _ in tqdm(range(iterations)):
-            pairs = self.training_data.bigram_counts()
-            if len(pairs) == 0:
-                break
-            best_pair = max(pairs, key=pairs.get)
-            if pairs[best_pair] < threshold:
-                break
-            self.training_data.merge(*best_pair)
+        with self._pair_counter(n_jobs=n_jobs) as count_pairs:
+            for iteration in self._iterations(iterations):
+                pairs = count_pairs()
+                if len(pairs) == 0:
+                    self._checkpoint(iteration - 1, converged=True)
+                    break
+                best_pair = max(pairs, key=pairs.get)
+                if pairs[best_pair] < threshold:
+                    self._checkpoint(iteration - 1, converged=True)
+                    break
+                self.training_data.merge(*best_pair)
+                self.merges.append((tuple(best_pair[0]), tuple(best_pair[1])))
 
-            alphabet_size = len(self.training_data.unigram_counts())
+                alphabet_size = len(self.training_data.unigram_counts())
+                self.alphabet_sizes.append(alphabet_size)
 
-            # update training history
-            if callbacks:
-                if "alphabet_size" in callbacks:
-                    self.training_history["alphabet_size"].append(alphabet_size)
-                if "f1" in callbacks:
-                    f1, precision, recall = self.training_data.f1_score()
-                    self.training_history["f1"].append(f1)
-                    self.training_history["precision"].append(precision)
-                    self.training_history["recall"].append(recall)
+                # update training history
+                logs = {"alphabet_size": alphabet_size}
+                for callback in callbacks:
+                    callback.on_iteration(self, len(self.merges), **logs)
 
-            if alphabet_size == kwargs.get("vocab_size", 0):
-                break
+                self._iteration(merges=1, words=len(self.training_data))
 
+                if alphabet_size == kwargs.get("vocab_size", 0):
+                    self._checkpoint(iteration, converged=True)
+                    break
+                self._checkpoint(iteration, force=iteration == iterations)
+
+        for callback in callbacks:
+            callback.on_train_end(self, len(self.merges), **logs)
+
+    def _get_training_state(self):
+        return {"merges": self.merges, "alphabet_sizes": self.alphabet_sizes}
+
+    def _set_training_state(self, state):
+        self.merges = state["merges"]
+        self.alphabet_sizes = state["alphabet_sizes"]
+
+    def _postprocess(self):
+        self.vocabulary = self.forms.unigram_counts()
+
+    def _segment(self, word):
+        return Word([list(m) for m in _apply_merges(form_key(word), self.merges)])
+
+    def _get_state(self):
+        return {
+            "merges": [[list(left), list(right)] for left, right in self.merges],
+            "vocabulary": [[list(m), count] for m, count in self.vocabulary.items()]
+        }
 
-class WordPiece(Tokenizer):
+    def _set_state(self, state):
+        self.merges = [(tuple(left), tuple(right)) for left, right in state["merges"]]
+        self.vocabulary = {Morpheme(m): count for m, count in state["vocabulary"]}
+
+
+class WordPiece(MergeTokenizer):
     def _preprocess(self, wp_prefix="##", **kwargs):
         self.training_data = self.forms
         self.training_data.split_everywhere()
         if wp_prefix:
             self.training_data.add_wp_token(wp_token=wp_prefix)
 
-    def _train(self, iterations=60, threshold=0, wp_prefix="##", **kwargs):
-        alphabet = self.training_data.unigram_counts()
-
-        callbacks = kwargs.get("callbacks")
-        if callbacks:
-            self.training_history = collections.defaultdict(list)
-
-        for _ in tqdm(range(iterations)):
-            # count bigram frequencies
-            bigram_freq = self.training_data.bigram_counts()
-
-            # get pair with best score
-            best_score = 0.0
-            best_pair = None
-            best_pair_freq = 0
-
-            for pair, freq in bigram_freq.items():
-                s1, s2 = pair
-                score = freq / (alphabet[s1] * alphabet[s2])
-                if score > best_score:
-                    best_score = score
-                    best_pair = pair
-                    best_pair_freq = freq
-
-            # stop merging if no score exceeds the threshold, or if there is nothing left to merge
-            if best_score < threshold or not best_pair:
-                break
-
-            # update alphabet frequencies
-            best_first, best_second = best_pair
-            alphabet[best_first] -= best_pair_freq
-            alphabet[best_second] -= best_pair_freq
-
-            # remove special prefix from second part, add merged pair to the alphabet
-            stripped_second = best_second.copy()
-            if wp_prefix:
-                stripped_second.remove(wp_prefix)
-            alphabet[best_first + stripped_second] = best_pair_freq
+    def _train(self, iterations=60, threshold=0, wp_prefix="##", n_jobs=1, **kwargs):
+        if self._start_iteration == 0:
+            self.alphabet = self.training_data.unigram_counts(n_jobs=n_jobs)
+            self.merges = []
+            self.alphabet_sizes = []
+        alphabet = self.alphabet
+
+        callbacks = self._begin_callbacks(kwargs.get("callbacks"))
+        self.wp_prefix = wp_prefix
+        logs = {}
+
+        with self._pair_counter(n_jobs=n_jobs, wp_token=wp_prefix) as count_pairs:
+            for iteration in self._iterations(iterations):
+                # count bigram frequencies
+                bigram_freq = count_pairs()
+
+                # get pair with best score
+                best_score = 0.0
+                best_pair = None
+                best_pair_freq = 0
+
+                for pair, freq in bigram_freq.items():
+                    s1, s2 = pair
+                    score = freq / (alphabet[s1] * alphabet[s2])
+                    if score > best_score:
+                        best_score = score
+                        best_pair = pair
+                        best_pair_freq = freq
+
+                # stop merging if no score exceeds the threshold, or if there is nothing left to merge
+                if best_score < threshold or not best_pair:
+                    self._checkpoint(iteration - 1, converged=True)
+                    break
 
-            self.training_data.merge(best_first, best_second, wp_token=wp_prefix)
+                # update alphabet frequencies
+                best_first, best_second = best_pair
+                alphabet[best_first] -= best_pair_freq
+                alphabet[best_second] -= best_pair_freq
 
-            clean_alphabet = set()
-            for key, value in alphabet.items():
-                clean_key = key.copy()
+                # remove special prefix from second part, add merged pair to the alphabet
+                stripped_second = best_second.copy()
                 if wp_prefix:
-                    while wp_prefix in clean_key:
-                        clean_key.remove(wp_prefix)
-                if value > 0:
-                    clean_alphabet.add(tuple(clean_key))
-
-            alphabet_size = len(clean_alphabet)
-
-            # update training history
-            if callbacks:
-                if "alphabet_size" in callbacks:
-                    alphabet_size = len([x for x in alphabet if alphabet[x] > 0])
-                    self.training_history["alphabet_size"].append(alphabet_size)
-                if "f1" in callbacks:
-                    f1, precision, recall = self.training_data.f1_score(ignore_token=wp_prefix)
-                    self.training_history["f1"].append(f1)
-                    self.training_history["precision"].append(precision)
-                    self.training_history["recall"].append(recall)
-
-            # stop if desired alphabet size is reached
-            if alphabet_size == kwargs.get("vocab_size", 0):
-                break
+                    stripped_second.remove(wp_prefix)
+                alphabet[best_first + stripped_second] = best_pair_freq
+
+                self.training_data.merge(best_first, best_second, wp_token=wp_prefix)
+                self.merges.append((tuple(best_first), tuple(best_second)))
+
+                clean_alphabet = set()
+                for key, value in alphabet.items():
+                    clean_key = key.copy()
+                    if wp_prefix:
+                        while wp_prefix in clean_key:
+                            clean_key.remove(wp_prefix)
+                    if value > 0:
+                        clean_alphabet.add(tuple(clean_key))
+
+                alphabet_size = len(clean_alphabet)
+                self.alphabet_sizes.append(alphabet_size)
+
+                # update training history
+                logs = {"alphabet_size": alphabet_size, "ignore_token": wp_prefix}
+                for callback in callbacks:
+                    callback.on_iteration(self, len(self.merges), **logs)
+
+                self._iteration(merges=1, words=len(self.training_data))
+
+                # stop if desired alphabet size is reached
+                if alphabet_size == kwargs.get("vocab_size", 0):
+                    self._checkpoint(iteration, converged=True)
+                    break
+                self._checkpoint(iteration, force=iteration == iterations)
+
+        for callback in callbacks:
+            callback.on_train_end(self, len(self.merges), **logs)
 
         # remove special prefix token from vocabulary
         if wp_prefix:
             self.training_data.remove_wp_token(wp_token=wp_prefix)
 
+    def _get_training_state(self):
+        return {"merges": self.merges, "alphabet": self.alphabet, "alphabet_sizes": self.alphabet_sizes}
+
+    def _set_training_state(self, state):
+        self.merges = state["merges"]
+        self.alphabet = state["alphabet"]
+        self.alphabet_sizes = state["alphabet_sizes"]
+
+    def _postprocess(self):
+        self.vocabulary = self.forms.unigram_counts()
+
+    def _segment(self, word):
+        return Word([list(m) for m in _apply_merges(form_key(word), self.merges, wp_token=self.wp_prefix)])
+
+    def _get_state(self):
+        return {
+            "merges": [[list(left), list(right)] for left, right in self.merges],
+            "wp_prefix": self.wp_prefix,
+            "vocabulary": [[list(m), count] for m, count in self.vocabulary.items()]
+        }
+
+    def _set_state(self, state):
+        self.merges = [(tuple(left), tuple(right)) for left, right in state["merges"]]
+        self.wp_prefix = state["wp_prefix"]
+        self.vocabulary = {Morpheme(m): count for m, count in state["vocabulary"]}
+
 
 class UnigramSentencePiece(Tokenizer):
     def __init__(self):
         super().__init__()
 
-    def _preprocess(self, vocab_size=60, count_single_characters=False, **kwargs):
+    def _preprocess(self, vocab_size=60, count_single_characters=False, n_jobs=1, max_entries=None,
+                    seed_vocab_size=None, **kwargs):
         super()._preprocess(**kwargs)
         self.vocab = collections.Counter()
         self.vocab_size = vocab_size
-        self._create_ngrams()
+        self._create_ngrams(n_jobs=n_jobs, max_entries=max_entries, seed_vocab_size=seed_vocab_size)
         if not count_single_characters:
             self.vocab_size += len({x for x in self.vocab if len(x) == 1})
         self._compute_probs()
     
-    def _create_ngrams(self):
-        for word in self.training_data:
-            word = word.unsegmented[0]
-            for i in range(len(word)):
-                for j in range(i + 1, len(word) + 1):
-                    subword = word[i:j]
-                    self.vocab[subword] += 1
+    def _create_ngrams(self, n_jobs=1, max_entries=None, seed_vocab_size=None):
+        """
+        Count all substrings of the training forms, which make up the initial vocabulary.
+
+        :param n_jobs: count the substrings in shards in `n_jobs` worker processes.
+        :param max_entries: count the substrings out of core, holding at most `max_entries` of them in memory
+            (see `morseg.utils.external`). Use this together with `seed_vocab_size` to bound the memory use.
+        :param seed_vocab_size: only keep this many of the most frequent substrings with more than one segment
+            (single segments are always kept).
+        """
+        words = (word.unsegmented[0] for word in self.training_data)
+        counts = None
+
+        if max_entries is not None:
+            from morseg.utils.external import count_ngrams_external
+            counts = count_ngrams_external(words, max_entries=max_entries)
+        elif resolve_n_jobs(n_jobs) > 1:
+            from morseg.utils.counting import count_ngrams
+            counts = count_ngrams(words, n_jobs=n_jobs).items()
+        else:
+            for word in words:
+                for i in range(len(word)):
+                    for j in range(i + 1, len(word) + 1):
+                        subword = word[i:j]
+                        self.vocab[subword] += 1
+
+        if seed_vocab_size is not None:
+            from morseg.utils.external import most_frequent
+            counts = most_frequent(counts if counts is not None else self.vocab.items(), seed_vocab_size,
+                                   keep=lambda ngram: len(ngram) == 1).items()
+            self.vocab.clear()
+
+        if counts is not None:
+            self.vocab.update({Morpheme(list(ngram)): count for ngram, count in counts})
+
         return self.vocab
 
     def _compute_probs(self):
@@ -278,7 +882,7 @@ class UnigramSentencePiece(Tokenizer):
 
     def _log_likelihood(self):
         log_likelihood = 0
-        for form in tqdm(self.training_data):
+        for form in _progress(self.training_data):
             form = form.unsegmented[0]
             log_likelihood += self._viterbi(form)[1]
 
@@ -296,26 +900,70 @@ class UnigramSentencePiece(Tokenizer):
         self._compute_probs()
 
     def _train(self, max_iterations=60, convergence_threshold=1e-4, percent_to_remove=0.1, **kwargs):
-        callbacks = kwargs.get("callbacks", {})
-        if callbacks:
-            self.training_history = collections.defaultdict(list)
+        callbacks = self._begin_callbacks(kwargs.get("callbacks"))
+        if self._start_iteration == 0:
+            self.prev_likelihood = self._log_likelihood()
+        iteration = self._start_iteration
+        logs = {}
 
-        prev_likelihood = self._log_likelihood()
-
-        for _ in tqdm(range(max_iterations)):
+        for iteration in self._iterations(max_iterations):
             self._prune_vocab()
-            if "alphabet_size" in callbacks:
-                self.training_history["alphabet_size"].append(len({x for x in self.vocab if len(x) > 1}))
+            logs = {"alphabet_size": len({x for x in self.vocab if len(x) > 1})}
+            for callback in callbacks:
+                callback.on_iteration(self, iteration, **logs)
             likelihood = self._log_likelihood()
-            if abs(likelihood - prev_likelihood) < convergence_threshold or len(self.vocab) <= self.vocab_size:
+            self._iteration(words=len(self.training_data))
+            if abs(likelihood - self.prev_likelihood) < convergence_threshold or len(self.vocab) <= self.vocab_size:
+                self._checkpoint(iteration, converged=True)
                 break
-            prev_likelihood = likelihood
+            self.prev_likelihood = likelihood
+            self._checkpoint(iteration, force=iteration == max_iterations)
+
+        for callback in callbacks:
+            callback.on_train_end(self, iteration, **logs)
+
+    def _get_training_state(self):
+        return {
+            "vocab": self.vocab,
+            "vocab_size": self.vocab_size,
+            "model": self.model,
+            "prev_likelihood": self.prev_likelihood
+        }
+
+    def _set_training_state(self, state):
+        self.vocab = state["vocab"]
+        self.vocab_size = state["vocab_size"]
+        self.model = state["model"]
+        self.prev_likelihood = state["prev_likelihood"]
 
     def _postprocess(self):
         for form in self.forms:
             segmented, _ = self._viterbi(form.unsegmented[0])
             form.update(segmented)
 
+    def _snapshot(self, forms):
+        # the training forms are only segmented after training
+        snapshot = []
+        for form in forms:
+            form = form.copy()
+            form.update(self._viterbi(form.unsegmented[0])[0])
+            snapshot.append(form)
+        return snapshot
+
+    def _segment(self, word):
+        unsegmented = form_key(word)
+        segmented, score = self._viterbi(unsegmented)
+        if score == math.inf:
+            # the word contains segments that are not in the vocabulary
+            return Word([list(unsegmented)])
+        return Word([list(m) for m in segmented])
+
+    def _get_state(self):
+        return {"model": [[list(token), log_prob] for token, log_prob in self.model.items()]}
+
+    def _set_state(self, state):
+        self.model = {tuple(token): log_prob for token, log_prob in state["model"]}
+
     def _viterbi(self, word, ignore=None):
         word = tuple(word)
         eow_index = len(word) + 1
@@ -347,38 +995,197 @@ class UnigramSentencePiece(Tokenizer):
         return subwords, likelihood_scores[-1]
 
 
+def _segment_compound(model, compound):
+    """
+    Look up the segmentation of a training compound, or find the best segmentation of a new one with Viterbi.
+    """
+    try:
+        return model.segment(compound)
+    except KeyError:
+        constructions, _ = model.viterbi_segment(compound)
+        return constructions
+
+
+def _segment_compounds_chunk(chunk):
+    model = get_worker_state("model")
+    memo = get_worker_state("memo")
+    segmentations = []
+
+    for compound in chunk:
+        constructions = memo.get(compound)
+        if constructions is None:
+            constructions = _segment_compound(model, compound)
+            memo[compound] = constructions
+        segmentations.append(constructions)
+
+    return segmentations
+
+
 class Morfessor(Tokenizer):
     def _preprocess(self, **kwargs):
-        if not morfessor:
-            raise ValueError("You must install the morfessor software package")
+        _import_morfessor()
         self.training_data = [(1, tuple(m[0])) for m in self.forms.unsegmented()]
 
-    def _train(self, **kwargs):
+    def _train(self, init_model=None, n_jobs=1, **kwargs):
+        """
+        Train a Morfessor Baseline model in batch mode. With `init_model` (a saved model file or a `BaselineModel`),
+        training continues from an existing model: only compounds that the model does not know yet are added, and
+        the existing analyses serve as the starting point. With `n_jobs > 1`, the training forms are segmented
+        in parallel afterwards.
+        """
+        morfessor = _import_morfessor()
+
         # sanitize kwargs
         kws = set(kwargs.keys())
         for kw in kws:
             if kw not in ["algorithm", "algorithm_params", "finish_threshold", "max_epochs"]:
                 kwargs.pop(kw)
 
-        self.model = morfessor.BaselineModel()
-        self.model.load_data(self.training_data)
+        if init_model is None:
+            self.model = morfessor.BaselineModel()
+            training_data = self.training_data
+        else:
+            if isinstance(init_model, morfessor.BaselineModel):
+                self.model = copy.deepcopy(init_model)
+            else:
+                self.model = self.load_model(init_model)
+            known = set(self.model.get_compounds())
+            training_data = [(count, compound) for count, compound in self.training_data if compound not in known]
+
+        self.n_jobs = n_jobs
+        self.model.load_data(training_data)
         self.model.train_batch(**kwargs)
 
     def _postprocess(self):
         """
         Store segmentations from Morfessor in own model.
         """
-        for f in self.forms:
-            res = self.model.segment(tuple(f.unsegmented[0]))
+        segmentations = self.tokenize_batch(self.forms.unsegmented(), n_jobs=getattr(self, "n_jobs", 1))
+        for f, res in zip(self.forms, segmentations):
             f.update(res)
 
+    def _segment(self, word):
+        return Word([list(c) for c in _segment_compound(self.model, form_key(word))])
+
+    def tokenize_batch(
+            self,
+            words: Iterable[Word],
+            n_jobs=1,
+            chunk_size=1000,
+            memo_size=100000,
+            **kwargs
+    ):
+        """
+        Segment an iterable of words with the underlying model, distributed over `n_jobs` worker processes.
+        Only the Morfessor model is sent to the workers. Training compounds are looked up, new ones are
+        segmented with Viterbi; every worker memoizes up to `memo_size` segmentations, so that recurring
+        forms are only segmented once.
+        """
+        chunks = imap_chunks(
+            _segment_compounds_chunk,
+            (form_key(word) for word in words),
+            n_jobs=n_jobs,
+            chunk_size=chunk_size,
+            initializer=set_worker_state,
+            initargs=({"model": self.model, "memo": LRUCache(maxsize=memo_size)},)
+        )
+        for chunk in chunks:
+            for constructions in chunk:
+                yield Word([list(c) for c in constructions])
+
+    def train_online(
+            self,
+            forms: Iterable,
+            epoch_interval=10000,
+            max_epochs=None,
+            checkpoint_dir=None,
+            checkpoint_interval=1,
+            init_model=None,
+            algorithm="recursive",
+            algorithm_params=()
+    ):
+        """
+        Train the model with Morfessor's online algorithm on a stream of forms, e.g. from
+        `WordlistWrapper.iter_file`. Forms are consumed one at a time and every occurrence is counted, so memory
+        use is bounded by the size of the model's lexicon rather than by the size of the corpus. The training
+        forms are not stored; use `tokenize_batch` to segment a stream afterwards.
+
+        :param forms: an iterable of forms, each given as a sequence of morphemes.
+        :param epoch_interval: the number of forms per epoch, after which Morfessor updates its cost estimates.
+        :param max_epochs: stop after that many epochs, even if the stream is not exhausted.
+        :param checkpoint_dir: if given, the model is written to "morfessor.bin" in this directory every
+            `checkpoint_interval` epochs and at the end of training.
+        :param init_model: a saved model file or `BaselineModel` to continue training, e.g. from a checkpoint.
+        """
+        morfessor = _import_morfessor()
+
+        if self.cache is not None:
+            self.cache.clear()
+
+        if init_model is None:
+            self.model = morfessor.BaselineModel()
+        elif isinstance(init_model, morfessor.BaselineModel):
+            self.model = copy.deepcopy(init_model)
+        else:
+            self.model = self.load_model(init_model)
+
+        self.forms = WordlistWrapper([])
+        compounds = self._stream_compounds(forms, epoch_interval * checkpoint_interval, checkpoint_dir)
+        self.model.train_online(compounds, epoch_interval=epoch_interval, algorithm=algorithm,
+                                algorithm_params=algorithm_params, max_epochs=max_epochs)
+
+        if checkpoint_dir:
+            self._write_checkpoint(checkpoint_dir)
+
+    def _stream_compounds(self, forms, checkpoint_every, checkpoint_dir):
+        for i, form in enumerate(forms, start=1):
+            yield 1, form_key(form)
+            # the previous compound has been processed when the next one is requested
+            if checkpoint_dir and i % checkpoint_every == 0:
+                self._write_checkpoint(checkpoint_dir)
+
+    def _write_checkpoint(self, checkpoint_dir):
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        path = os.path.join(checkpoint_dir, "morfessor.bin")
+        self.save_model(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def save_model(self, path):
+        """
+        Store the underlying Morfessor model in Morfessor's binary model format.
+        """
+        _import_morfessor().MorfessorIO().write_binary_model_file(str(path), self.model)
+
+    @staticmethod
+    def load_model(path):
+        """
+        Load a model in Morfessor's binary model format, e.g. to warm-start training with `init_model`.
+        """
+        return _import_morfessor().MorfessorIO().read_binary_model_file(str(path))
+
+    def _get_state(self):
+        return {
+            "segmentations": [
+                [count, list(compound), [list(c) for c in constructions]]
+                for count, compound, constructions in self.model.get_segmentations()
+            ]
+        }
+
+    def _set_state(self, state):
+        self.model = _import_morfessor().BaselineModel()
+        self.model.load_segmentations(
+            (count, tuple(compound), [tuple(c) for c in constructions])
+            for count, compound, constructions in state["segmentations"]
+        )
+
 
 class LSVTokenizer(Tokenizer):
     # the possible values for each parameter.
     # the first value doubles as default option.
     param_options = {
         "method": ["type", "entropy", "max_drop", "normalized"],
-        "strategy": ["peak", "rise", "threshold", "subword"]
+        "strategy": ["peak", "rise", "threshold", "subword"],
+        "backend": ["python", "numpy"]
     }
 
     def __init__(self, **kwargs):
@@ -414,6 +1221,8 @@ class LSVTokenizer(Tokenizer):
             entropy = 0.0
             sum_varieties = sum(varieties)
             for v in varieties:
+                if v == 0:
+                    continue  # unseen words are padded with zero counts
                 p = v / sum_varieties
                 entropy -= p * math.log2(p)
             entropies.append(entropy)
@@ -421,9 +1230,13 @@ class LSVTokenizer(Tokenizer):
         return entropies
 
     def _calculate_successor_max_drop(self, token_variety: list):
-        return [1 - max(x) / sum(x) for x in token_variety]
+        return [1 - max(x) / sum(x) if sum(x) > 0 else 0.0 for x in token_variety]
 
     def _calculate_exp_lsv(self):
+        if self.params["backend"] == "numpy":
+            self.expected_sv = self.packed_varieties.expected_type_variety().tolist()
+            return
+
         # calculate regular LSV first
         type_varieties = [[len(x) for x in token_variety] for token_variety in self.token_varieties.values()]
 
@@ -452,17 +1265,15 @@ class LSVTokenizer(Tokenizer):
         # TODO check whether this works properly, oversegmentation is suspiciously strong
 
         for i in range(len(norm_sv)):
-            norm_sv[i] /= self.expected_sv[i]
+            # unseen words can be longer than all training words
+            norm_sv[i] /= self.expected_sv[min(i, len(self.expected_sv) - 1)]
 
         return norm_sv
 
     def _get_token_varieties(self):
         return {word.unsegmented: self.training_data.get_token_variety(word) for word in self.forms}
 
-    def _train(self, **kwargs):
-        # cache segmentations with specified parameters
-        self.token_varieties = self._get_token_varieties()
-
+    def _get_variety_func(self):
         var_func_mapping = {
             "type": self._calculate_type_variety,
             "entropy": self._calculate_successor_entropy,
@@ -470,18 +1281,61 @@ class LSVTokenizer(Tokenizer):
             "normalized": self._calculate_norm_lsv
         }
 
-        # get the corresponding function to calculate variety values
-        var_func = var_func_mapping.get(self.params["method"], self._calculate_type_variety)
+        return var_func_mapping.get(self.params["method"], self._calculate_type_variety)
 
-        # preprocessing step for normalized LSV
-        if self.params["method"] == "normalized":
-            self._calculate_exp_lsv()
+    def _get_variety_key(self, word: Word) -> Word:
+        """
+        The key under which the varieties of an unsegmented word are stored.
+        """
+        return word
+
+    def _prepare_token_varieties(self):
+        self.token_varieties = self._get_token_varieties()
+
+        # the numpy backend packs the varieties of all words into flat arrays
+        if self.params["backend"] == "numpy":
+            from morseg.algorithms.variety import PackedVarieties
+            self.packed_varieties = PackedVarieties(list(self.token_varieties.values()))
+
+    def _calculate_varieties_vectorized(self):
+        packed = self.packed_varieties
+        method = self.params["method"]
+
+        if method == "entropy":
+            values = packed.successor_entropy()
+        elif method == "max_drop":
+            values = packed.successor_max_drop()
+        elif method == "normalized":
+            values = packed.normalized_type_variety(self.expected_sv)
+        else:
+            values = packed.type_variety()
+
+        self.varieties = dict(zip(self.token_varieties, packed.to_lists(values)))
+        self.variety_matrix = packed.to_matrix(values)
+
+    def _calculate_varieties(self):
+        if self.params["backend"] == "numpy":
+            self._calculate_varieties_vectorized()
+            return
+
+        # get the corresponding function to calculate variety values
+        var_func = self._get_variety_func()
 
         # calculate variety values for each word
         self.varieties = {}
         for word, token_var in self.token_varieties.items():
             self.varieties[word] = var_func(token_var)
 
+    def _train(self, **kwargs):
+        # cache segmentations with specified parameters
+        self._prepare_token_varieties()
+
+        # preprocessing step for normalized LSV
+        if self.params["method"] == "normalized":
+            self._calculate_exp_lsv()
+
+        self._calculate_varieties()
+
     def _get_splits_at_peak(self, varieties):
         """
         Peak and plateau segmentation strategy, as formalized by Hafer and Weiss (1974).
@@ -522,7 +1376,7 @@ class LSVTokenizer(Tokenizer):
         subwords = self.training_data.get_subwords(word)
         return [len(x) for x in subwords]
 
-    def _get_splits(self):
+    def _get_word_splits(self, word, varieties):
         split_func_mapping = {
             "peak": self._get_splits_at_peak,
             "rise": self._get_splits_at_rise,
@@ -533,24 +1387,60 @@ class LSVTokenizer(Tokenizer):
         strategy = self.params["strategy"]
         split_func = split_func_mapping.get(strategy, self._get_splits_at_peak)
 
+        if strategy == "subword":
+            return split_func(word)
+        return split_func(varieties)
+
+    def _get_splits(self):
+        if self.params["backend"] == "numpy" and self.params["strategy"] != "subword":
+            from morseg.algorithms.variety import get_splits
+            splits = get_splits(self.variety_matrix, self.packed_varieties.lengths, self.params["strategy"],
+                                threshold=self.params.get("threshold"))
+            return dict(zip(self.varieties, splits))
+
         splits_by_word = {}
 
         for word, varieties in self.varieties.items():
-            if strategy == "subword":
-                splits = split_func(word)
-            else:
-                splits = split_func(varieties)
-            splits_by_word[word] = splits
+            splits_by_word[word] = self._get_word_splits(word, varieties)
 
         return splits_by_word
 
+    def _apply_splits(self, form: WordWrapper, key: Word, splits):
+        for i in splits:
+            if self.training_data.is_branching(key[0][:i]):
+                form.split(i)
+
     def _postprocess(self):
         splits_by_word = self._get_splits()
 
         for word, splits in splits_by_word.items():
-            for i in splits:
-                if self.training_data.is_branching(word[0][:i]):
-                    self.forms[word].split(i)
+            self._apply_splits(self.forms[word], word, splits)
+
+    def _segment(self, word):
+        form = _unsegmented(word)
+        key = self._get_variety_key(form.unsegmented)
+
+        varieties = self.varieties.get(key)
+        if varieties is None:
+            varieties = self._get_variety_func()(self.training_data.get_token_variety(form))
+
+        self._apply_splits(form, key, self._get_word_splits(key, varieties))
+        return form
+
+    def _get_state(self):
+        return {
+            "params": self.params,
+            "trie": self.training_data.to_dict(),
+            "varieties": [[list(word[0]), varieties] for word, varieties in self.varieties.items()],
+            "expected_sv": getattr(self, "expected_sv", None)
+        }
+
+    def _set_state(self, state):
+        self.params = state["params"]
+        self.training_data = Trie.from_dict(state["trie"])
+        self.varieties = {Form([word]): varieties for word, varieties in state["varieties"]}
+        if state["expected_sv"] is not None:
+            self.expected_sv = state["expected_sv"]
 
     def _tokenize(self, word, **kwargs):
         if (kwargs.get("method", self.params["method"]) == self.params["method"] and
@@ -565,17 +1455,28 @@ class LPVTokenizer(LSVTokenizer):
     def _preprocess(self, **kwargs):
         self.training_data = Trie(self.forms, reverse=True)
 
+    def _get_variety_key(self, word: Word) -> Word:
+        reversed_word = Morpheme(word[0])
+        reversed_word.reverse()
+        return Form(reversed_word)
+
     def _get_token_varieties(self):
         token_varieties = {}
 
         for word in self.forms:
-            reversed_word = Morpheme(word.unsegmented[0])
-            reversed_word.reverse()
-            reversed_word = Word(reversed_word)
+            reversed_word = self._get_variety_key(word.unsegmented)
             token_varieties[reversed_word] = self.training_data.get_token_variety(word)
 
         return token_varieties
 
+    def _apply_splits(self, form: WordWrapper, key: Word, splits):
+        word_len = len(key[0])
+
+        for i in splits:
+            split_idx = word_len - i
+            if self.training_data.is_branching(key[0][:i]):
+                form.split(split_idx)
+
     def _postprocess(self):
         splits_by_word = self._get_splits()
 
@@ -583,13 +1484,8 @@ class LPVTokenizer(LSVTokenizer):
         for reversed_word, splits in splits_by_word.items():
             word = Morpheme(reversed_word[0])
             word.reverse()
-            word_len = len(word)
-            word = Word(word)
 
-            for i in splits:
-                split_idx = word_len - i
-                if self.training_data.is_branching(reversed_word[0][:i]):
-                    self.forms[word].split(split_idx)
+            self._apply_splits(self.forms[tuple(word)], reversed_word, splits)
 
 
 class LSPVTokenizer(Tokenizer):
@@ -599,9 +1495,35 @@ class LSPVTokenizer(Tokenizer):
 
         super().__init__(**kwargs)
 
-    def _train(self, **kwargs):
-        self.lsv.train(self.forms)
-        self.lpv.train(self.forms)
+    def _train(self, n_jobs=1, **kwargs):
+        """
+        Train both directions on the forms of this model, which are only read: each direction segments its own
+        copy-on-write copy, so that the LSV and LPV models keep their own segmentations. With `n_jobs > 1`,
+        both directions are trained concurrently in two processes, which read the wordlist from memory shared
+        with the parent process (on platforms that fork).
+        """
+        if resolve_n_jobs(n_jobs) == 1:
+            self.lsv.train(self.forms)
+            self.lpv.train(self.forms)
+            return
+
+        chunks = imap_chunks(
+            _train_on_shared_forms,
+            [self.lsv, self.lpv],
+            n_jobs=2,
+            chunk_size=1,
+            initializer=set_worker_state,
+            initargs=({"forms": self.forms},)
+        )
+        trained = [result for chunk in chunks for result in chunk]
+
+        for model, (trained_model, splits) in zip([self.lsv, self.lpv], trained):
+            # update the models in place, as they may have been passed in by the caller
+            model.__dict__.update(trained_model.__dict__)
+            model.forms = self.forms.copy()
+            for form, form_splits in zip(model.forms, splits):
+                for i in form_splits:
+                    form.split(i)
 
     def _postprocess(self):
         for f in self.forms:
@@ -609,6 +1531,20 @@ class LSPVTokenizer(Tokenizer):
             for i in splits:
                 f.split(i)
 
+    def _segment(self, word):
+        form = _unsegmented(word)
+        for i in self.lsv._tokenize(word).get_splits() + self.lpv._tokenize(word).get_splits():
+            form.split(i)
+        return form
+
+    def _get_state(self):
+        return {"lsv": self.lsv._get_state(), "lpv": self.lpv._get_state()}
+
+    def _set_state(self, state):
+        for model, model_state in [(self.lsv, state["lsv"]), (self.lpv, state["lpv"])]:
+            model.forms = WordlistWrapper([])
+            model._set_state(model_state)
+
 
 class SquareEntropyTokenizer(Tokenizer):
     """
@@ -632,7 +1568,7 @@ class SquareEntropyTokenizer(Tokenizer):
                 self.training_data[word].append((word[:i], word[i:]))
 
         # set up a dictionary in which affixality metrics will be stored
-        self.metrics = collections.defaultdict(lambda: collections.defaultdict(list))
+        self.metrics = collections.defaultdict(functools.partial(collections.defaultdict, list))
 
     def _normalize(self, values):
         return [x / max(values) for x in values] if max(values) > 0 else len(values) * [0.0]
@@ -752,9 +1688,31 @@ class SquareEntropyTokenizer(Tokenizer):
                                   (squares[i] + suffix_entropy[i] + suffix_economy[i]) / 3)
                 self.metrics[word]["affixiality"].append(affixiality)
 
+    def _apply_affixiality(self, form: WordWrapper):
+        affixialities = self.metrics[form.unsegmented[0]]["affixiality"]
+        for i, af in enumerate(affixialities):
+            if af > self.threshold:
+                form.split(i+1)
+
     def _postprocess(self):
         for form in self.forms:
-            affixialities = self.metrics[form.unsegmented[0]]["affixiality"]
-            for i, af in enumerate(affixialities):
-                if af > self.threshold:
-                    form.split(i+1)
+            self._apply_affixiality(form)
+
+    def _segment(self, word):
+        # squares and economy depend on the other training forms, so unseen words are left unsegmented
+        form = _unsegmented(word)
+        if form.unsegmented[0] in self.metrics:
+            self._apply_affixiality(form)
+        return form
+
+    def _get_state(self):
+        return {
+            "threshold": self.threshold,
+            "affixiality": [[list(word), metrics["affixiality"]] for word, metrics in self.metrics.items()]
+        }
+
+    def _set_state(self, state):
+        self.threshold = state["threshold"]
+        self.metrics = collections.defaultdict(functools.partial(collections.defaultdict, list))
+        for word, affixiality in state["affixiality"]:
+            self.metrics[Morpheme(word)]["affixiality"] = affixiality
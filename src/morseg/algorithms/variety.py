@@ -0,0 +1,154 @@
+"""
+Vectorized computation of successor variety measures and split strategies for a whole wordlist.
+
+The functions reproduce the sequential implementations in `LSVTokenizer` value by value: floating point
+operations are carried out on the same operands and in the same order.
+
+Timing (`benchmarks/run.py --tokenizers LSVTokenizer`, best of five runs, on 100k synthetic words): computing
+varieties and splits from the token varieties takes 0.61s / 2.03s / 1.53s / 1.26s with the "python" backend and
+0.53s / 1.40s / 1.01s / 0.55s with the "numpy" backend, for the type, entropy, max_drop and normalized methods.
+The remaining cost of the numpy backend is mostly the conversion of the successor counters (Python lists) into
+arrays. Note that collecting the token varieties from the trie dominates the total training time either way.
+"""
+import functools
+import itertools
+
+import numpy as np
+
+
+class PackedVarieties(object):
+    """
+    The token varieties of a list of words, packed into flat NumPy arrays.
+
+    Every word has one position per segment (plus the end of the word), and every position holds the counters of
+    all successors at that position. Counters are stored in one flat array, positions are identified by their
+    index in the concatenation of all words' positions. The counters are only packed when a measure needs them
+    (entropy and maximum drop), as converting them is the most expensive step.
+    """
+    def __init__(self, token_varieties: list):
+        # the lists are only iterated at C speed (`map` and `chain`), the packing itself is done by NumPy
+        self._positions = list(itertools.chain.from_iterable(token_varieties))
+
+        self.lengths = np.fromiter(map(len, token_varieties), dtype=np.int64, count=len(token_varieties))
+        self.num_successors = np.fromiter(map(len, self._positions), dtype=np.int64, count=len(self._positions))
+
+        # the index of the first counter of every position
+        self.starts = np.cumsum(self.num_successors) - self.num_successors
+
+        # row (word) and column (index in the word) of every position
+        self.row = np.repeat(np.arange(len(self.lengths)), self.lengths)
+        self.column = np.arange(len(self._positions)) - np.repeat(np.cumsum(self.lengths) - self.lengths,
+                                                                  self.lengths)
+
+    @functools.cached_property
+    def counts(self):
+        return np.fromiter(itertools.chain.from_iterable(self._positions), dtype=np.float64,
+                           count=int(self.num_successors.sum()))
+
+    @functools.cached_property
+    def position(self):
+        """
+        The position every counter belongs to.
+        """
+        return np.repeat(np.arange(len(self.num_successors)), self.num_successors)
+
+    @functools.cached_property
+    def totals(self):
+        return np.bincount(self.position, weights=self.counts, minlength=len(self.num_successors))
+
+    def type_variety(self):
+        return self.num_successors
+
+    def successor_entropy(self):
+        # unseen words are padded with zero counts, which do not contribute
+        p = np.divide(self.counts, self.totals[self.position], out=np.zeros(len(self.counts)), where=self.counts > 0)
+        terms = p * np.log2(p, out=np.zeros(len(p)), where=p > 0)
+
+        # subtract the terms of all positions at once, one successor rank after the other, so that every sum is
+        # accumulated in the same order as in the sequential implementation (`np.add.reduceat` would sum in a
+        # different order, and ties between positions could come out differently). Positions are sorted by
+        # their number of successors, so that the positions with at least `rank + 1` successors form a prefix.
+        order = np.argsort(-self.num_successors, kind="stable")
+        starts, num_successors = self.starts[order], self.num_successors[order]
+        num_active = np.searchsorted(-num_successors, -np.arange(num_successors.max(initial=0)), side="left")
+
+        sorted_entropies = np.zeros(len(order))
+        for rank, k in enumerate(num_active.tolist()):
+            sorted_entropies[:k] -= terms[starts[:k] + rank]
+
+        entropies = np.empty(len(order))
+        entropies[order] = sorted_entropies
+        return entropies
+
+    def successor_max_drop(self):
+        max_drops = np.zeros(len(self.totals))
+        if len(self.counts) == 0:
+            return max_drops
+
+        maxima = np.maximum.reduceat(self.counts, self.starts)
+        nonzero = self.totals > 0
+        max_drops[nonzero] = 1 - maxima[nonzero] / self.totals[nonzero]
+        return max_drops
+
+    def expected_type_variety(self):
+        """
+        The average type variety at every index, over all words that are long enough.
+        """
+        sums = np.bincount(self.column, weights=self.num_successors)
+        nums = np.bincount(self.column)
+        return sums / nums
+
+    def normalized_type_variety(self, expected_sv):
+        expected_sv = np.asarray(expected_sv, dtype=np.float64)
+        return self.num_successors / expected_sv[np.minimum(self.column, len(expected_sv) - 1)]
+
+    def to_matrix(self, values):
+        """
+        Arrange per-position values in a (words x positions) matrix, padded with NaN.
+        """
+        matrix = np.full((len(self.lengths), self.lengths.max(initial=0)), np.nan)
+        matrix[self.row, self.column] = values
+        return matrix
+
+    def to_lists(self, values):
+        """
+        Split per-position values into one list per word.
+        """
+        values = np.asarray(values).tolist()
+        bounds = np.cumsum(self.lengths).tolist()
+        return [values[start:end] for start, end in zip([0] + bounds[:-1], bounds)]
+
+
+def get_split_mask(matrix, lengths, strategy, threshold=None):
+    """
+    Mark the indices at which each word is split by the peak, rise or threshold strategy.
+    """
+    num_cols = matrix.shape[1]
+    cols = np.arange(num_cols)[None, :]
+    lengths = np.asarray(lengths)[:, None]
+    mask = np.zeros(matrix.shape, dtype=bool)
+
+    if strategy == "peak":
+        if num_cols > 2:
+            mask[:, 1:-1] = ((matrix[:, 1:-1] >= matrix[:, :-2]) & (matrix[:, 1:-1] >= matrix[:, 2:])
+                             & (cols[:, 2:] < lengths))
+    elif strategy == "rise":
+        if num_cols > 1:
+            mask[:, 1:] = (matrix[:, 1:] > matrix[:, :-1]) & (cols[:, 1:] < lengths)
+    elif strategy == "threshold":
+        mask = (matrix > threshold) & (cols < lengths)
+    else:
+        raise ValueError(f"Invalid value for argument strategy: '{strategy}'")
+
+    return mask
+
+
+def get_splits(matrix, lengths, strategy, threshold=None):
+    """
+    Return the split indices of every word as a list of lists.
+    """
+    mask = get_split_mask(matrix, lengths, strategy, threshold=threshold)
+    rows, cols = np.nonzero(mask)
+    bounds = np.searchsorted(rows, np.arange(len(lengths) + 1)).tolist()
+    cols = cols.tolist()
+    return [cols[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
@@ -1 +1,2 @@
-from .trie import Trie, TrieNode
\ No newline at end of file
+from .trie import Trie, TrieNode
+from .cache import LRUCache, CacheInfo
@@ -0,0 +1,63 @@
+from collections import OrderedDict, namedtuple
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+
+class LRUCache(object):
+    """
+    A size-bounded mapping that discards the least recently used entry once it is full.
+
+    Usage:
+    >>> cache = LRUCache(maxsize=2)
+    >>> cache["a"] = 1
+    >>> cache["b"] = 2
+    >>> cache.get("a")  # 1, "a" is now the most recently used entry
+    >>> cache["c"] = 3  # evicts "b"
+    >>> print(cache.info())  # CacheInfo(hits=1, misses=0, evictions=1, maxsize=2, currsize=2)
+    """
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError("The maximum size of the cache must be a positive integer.")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Look up a key and mark it as recently used. Hits and misses are counted.
+        """
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+        self.misses += 1
+        return default
+
+    def __setitem__(self, key, value):
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = value
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        """
+        Drop all entries. The hit, miss and eviction counters are kept.
+        """
+        self._data.clear()
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._data))
@@ -220,6 +220,53 @@ class Trie(object):
 
         return subwords
 
+    def to_dict(self):
+        """
+        Encode the trie as flat arrays of node characters, counters and numbers of children in preorder.
+        Children keep their insertion order, so that token varieties are preserved exactly.
+        """
+        chars, counters, num_children = [], [], []
+        stack = [self.root]
+
+        while stack:
+            node = stack.pop()
+            chars.append(node.char)
+            counters.append(node.counter)
+            num_children.append(len(node.children))
+            stack.extend(reversed(list(node.children.values())))
+
+        return {
+            "eos_symbol": self.EOS_SYMBOL,
+            "reverse": self.reverse,
+            "chars": chars,
+            "counters": counters,
+            "children": num_children
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a trie from the flat encoding produced by `to_dict`.
+        """
+        trie = cls(eos_symbol=data["eos_symbol"], reverse=data["reverse"])
+        trie.root.counter = data["counters"][0]
+
+        # stack of (node, number of children that still need to be attached)
+        stack = [(trie.root, data["children"][0])]
+
+        for char, counter, num_children in zip(data["chars"][1:], data["counters"][1:], data["children"][1:]):
+            while stack[-1][1] == 0:
+                stack.pop()
+            parent, remaining = stack[-1]
+            stack[-1] = (parent, remaining - 1)
+
+            node = TrieNode(char, eos_symbol=trie.EOS_SYMBOL)
+            node.counter = counter
+            parent.children[char] = node
+            stack.append((node, num_children))
+
+        return trie
+
     def __eq__(self, other):
         if not isinstance(other, type(self)):
             return False
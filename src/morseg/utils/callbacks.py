@@ -0,0 +1,187 @@
+"""
+Callbacks that track the progress of iterative training (PairEncoding, WordPiece, UnigramSentencePiece).
+
+Callbacks are passed to `train`, e.g. `model.train(wl, callbacks=[AlphabetSize(), F1Score(interval=10)])`, and
+write their measurements to `model.training_history`. For every measurement, the iteration (counting from 1)
+is recorded under `<key>_iteration`. The strings "alphabet_size" and "f1" are still accepted and stand for
+`AlphabetSize()` and `F1Score()`.
+"""
+import random
+
+from morseg.utils.wrappers import WordlistWrapper
+
+
+def _f1_score(forms, ignore_token=None):
+    return WordlistWrapper(forms).f1_score(ignore_token=ignore_token)
+
+
+class Callback(object):
+    """
+    Base class for callbacks, which are evaluated every `interval` iterations (and after the last iteration).
+    """
+    def __init__(self, interval=1):
+        if interval < 1:
+            raise ValueError("The interval must be a positive integer.")
+        self.interval = interval
+
+    def on_train_begin(self, model):
+        pass
+
+    def on_iteration(self, model, iteration, **logs):
+        if iteration % self.interval == 0:
+            self.evaluate(model, iteration, **logs)
+
+    def on_train_end(self, model, iteration, **logs):
+        # make sure that the state at the end of training is always measured
+        if iteration > 0 and iteration % self.interval != 0:
+            self.evaluate(model, iteration, **logs)
+
+    def close(self):
+        """
+        Release the resources of the callback. `train` calls this when training ends, also when it is aborted.
+        """
+
+    def evaluate(self, model, iteration, **logs):
+        raise NotImplementedError
+
+
+class AlphabetSize(Callback):
+    """
+    Record the size of the model's alphabet (the number of distinct subwords).
+    """
+    def evaluate(self, model, iteration, alphabet_size=None, **logs):
+        model.training_history["alphabet_size"].append(alphabet_size)
+        model.training_history["alphabet_size_iteration"].append(iteration)
+
+
+class F1Score(Callback):
+    """
+    Record F1 score, precision and recall of the current segmentation of the training forms.
+
+    :param interval: evaluate every `interval` iterations.
+    :param sample_size: evaluate on a fixed random sample of this many forms, instead of all of them.
+    :param seed: the seed for drawing the sample.
+    :param background: None to evaluate immediately, or "thread" or "process" to evaluate a snapshot of the
+        current segmentations in a background thread or process, while training continues. Background results
+        are added to the training history when training has finished.
+    """
+    def __init__(self, interval=1, sample_size=None, seed=0, background=None):
+        super().__init__(interval=interval)
+        if background not in (None, "thread", "process"):
+            raise ValueError(f"Invalid value for argument background: '{background}'")
+
+        self.sample_size = sample_size
+        self.seed = seed
+        self.background = background
+        self.forms = None
+        self._executor = None
+        self._pending = []
+
+    def on_train_begin(self, model):
+        forms = list(model.training_data)
+        if self.sample_size is not None and self.sample_size < len(forms):
+            forms = random.Random(self.seed).sample(forms, self.sample_size)
+        self.forms = forms
+
+        if self.background == "thread":
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        elif self.background == "process":
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=1)
+
+    def evaluate(self, model, iteration, ignore_token=None, **logs):
+        snapshot = model._snapshot(self.forms)
+        if self._executor is None:
+            self._record(model, iteration, _f1_score(snapshot, ignore_token=ignore_token))
+        else:
+            self._pending.append((iteration, self._executor.submit(_f1_score, snapshot, ignore_token)))
+
+    def on_train_end(self, model, iteration, **logs):
+        super().on_train_end(model, iteration, **logs)
+
+        if self._executor is not None:
+            for pending_iteration, future in self._pending:
+                self._record(model, pending_iteration, future.result())
+        self.close()
+
+    def close(self):
+        # results that are still pending when training is aborted are discarded
+        if self._executor is not None:
+            for _, future in self._pending:
+                future.cancel()
+            self._executor.shutdown()
+            self._executor = None
+        self._pending = []
+
+    @staticmethod
+    def _record(model, iteration, scores):
+        f1, precision, recall = scores
+        model.training_history["f1"].append(f1)
+        model.training_history["precision"].append(precision)
+        model.training_history["recall"].append(recall)
+        model.training_history["f1_iteration"].append(iteration)
+
+
+class StopTraining(Exception):
+    """
+    Raised by a callback to abort training, e.g. by EarlyStopping.
+    """
+
+
+class EarlyStopping(F1Score):
+    """
+    Record the F1 score every `interval` iterations (see F1Score) and abort hopeless training runs by raising
+    StopTraining: when the score has not improved by more than `min_delta` for `patience` evaluations, or when
+    it is still below `min_f1` after `grace_period` iterations.
+    """
+    def __init__(self, interval=10, patience=3, min_delta=0.0, min_f1=None, grace_period=0, sample_size=None,
+                 seed=0):
+        super().__init__(interval=interval, sample_size=sample_size, seed=seed)
+        if patience < 1:
+            raise ValueError("The patience must be a positive integer.")
+        self.patience = patience
+        self.min_delta = min_delta
+        self.min_f1 = min_f1
+        self.grace_period = grace_period
+        self._training = False
+
+    def on_train_begin(self, model):
+        super().on_train_begin(model)
+        self._training = True
+
+    def on_train_end(self, model, iteration, **logs):
+        # once training has ended, there is nothing left to stop
+        self._training = False
+        super().on_train_end(model, iteration, **logs)
+
+    def evaluate(self, model, iteration, **logs):
+        super().evaluate(model, iteration, **logs)
+        scores = model.training_history["f1"]
+        if not self._training:
+            return
+
+        if self.min_f1 is not None and iteration >= self.grace_period and scores[-1] < self.min_f1:
+            raise StopTraining(f"F1 score {scores[-1]:.4f} is below {self.min_f1} after {iteration} iterations.")
+
+        if len(scores) <= self.patience:
+            return
+        if max(scores[-self.patience:]) <= max(scores[:-self.patience]) + self.min_delta:
+            raise StopTraining(f"F1 score has not improved for {self.patience} evaluations.")
+
+
+def get_callbacks(callbacks):
+    """
+    Turn the `callbacks` argument of `train` into a list of callback objects.
+    """
+    names = {"alphabet_size": AlphabetSize, "f1": F1Score}
+    result = []
+
+    for callback in callbacks or []:
+        if isinstance(callback, str):
+            if callback not in names:
+                raise ValueError(f"Invalid callback: '{callback}'")
+            callback = names[callback]()
+        result.append(callback)
+
+    return result
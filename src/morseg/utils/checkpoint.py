@@ -0,0 +1,54 @@
+"""
+Periodic, atomic checkpoints of iterative training runs.
+"""
+import os
+import pickle
+import time
+
+
+CHECKPOINT_FILE = "checkpoint.pkl"
+
+
+class Checkpointer(object):
+    """
+    Decide when to write a checkpoint (every `interval` iterations and/or every `seconds` seconds), and write it
+    atomically: a checkpoint is first written to a temporary file, which then replaces the previous checkpoint,
+    so that a crash never leaves a partially written checkpoint behind.
+    """
+    def __init__(self, directory, interval=None, seconds=None):
+        if interval is None and seconds is None:
+            interval = 1
+        self.directory = directory
+        self.interval = interval
+        self.seconds = seconds
+        self._last_write = time.monotonic()
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, CHECKPOINT_FILE)
+
+    def due(self, iteration):
+        if self.interval is not None and iteration % self.interval == 0:
+            return True
+        return self.seconds is not None and time.monotonic() - self._last_write >= self.seconds
+
+    def write(self, data):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path + ".tmp", "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+        self._last_write = time.monotonic()
+
+
+def load_checkpoint(path):
+    """
+    Load a checkpoint from a checkpoint file or from the directory it was written to.
+    Checkpoints are pickle files, so only load checkpoints from trusted sources.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, CHECKPOINT_FILE)
+
+    with open(path, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,231 @@
+"""
+Sharded map-reduce counting of n-grams in large wordlists.
+
+The symbols (segments or morphemes) of all words are interned as integer ids and stored in one flat array. The
+words are split into shards of roughly equal numbers of symbols, the n-grams of every shard are encoded as
+integers and counted with NumPy, and the partial counts are merged. With `n_jobs > 1`, the shards are counted
+in worker processes, which read the ids from shared memory instead of receiving a copy of the corpus.
+"""
+import collections
+import itertools
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from morseg.utils.parallel import imap_chunks, resolve_n_jobs, set_worker_state, get_worker_state
+
+
+# n-grams are encoded as numbers in base `num_symbols`, which have to fit into signed 64-bit integers
+_MAX_CODE = 2 ** 63 - 1
+
+
+class InternedCorpus(object):
+    """
+    A list of words as a flat array of symbol ids, where word `i` spans `ids[offsets[i]:offsets[i + 1]]`.
+    """
+    def __init__(self, words):
+        index = {}
+        self.symbols = []
+        ids = []
+        offsets = [0]
+
+        for word in words:
+            for symbol in word:
+                i = index.get(symbol)
+                if i is None:
+                    i = index[symbol] = len(self.symbols)
+                    self.symbols.append(symbol)
+                ids.append(i)
+            offsets.append(len(ids))
+
+        self.ids = np.array(ids, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def max_code_length(self):
+        """
+        Return the maximal length of n-grams that can be encoded as 64-bit integers.
+        """
+        base = max(len(self.symbols), 2)
+        length = 1
+        while base ** (length + 1) <= _MAX_CODE:
+            length += 1
+        return length
+
+    def shards(self, num_shards):
+        """
+        Split the words into at most `num_shards` consecutive ranges with roughly equal numbers of symbols.
+        """
+        targets = np.linspace(0, len(self.ids), num_shards + 1)
+        bounds = np.unique(np.searchsorted(self.offsets, targets))
+        bounds[-1] = len(self)
+        return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _count_shard(ids, offsets, start, end, min_length, max_length, num_symbols, max_code_length):
+    """
+    Count the n-grams of the words `start` to `end` (exclusive) of length `min_length` to `max_length`.
+
+    :return: a dictionary from n-gram lengths to triples of unique codes, their counts and the positions of
+        their first occurrences in the corpus, and a dictionary from id tuples to counts and first positions
+        for n-grams that are too long to be encoded as integers.
+    """
+    first = offsets[start]
+    ids = ids[offsets[start]:offsets[end]]
+    offsets = offsets[start:end + 1] - offsets[start]
+
+    # for every position, the end of the word it belongs to
+    ends = np.repeat(offsets[1:], np.diff(offsets))
+    positions = np.arange(len(ids), dtype=np.int64)
+    codes = np.zeros(len(ids), dtype=np.int64)
+
+    counts = {}
+    long_ngrams = {}
+
+    for length in range(1, max_length + 1):
+        valid = positions + length <= ends
+        positions, ends, codes = positions[valid], ends[valid], codes[valid]
+        if len(positions) == 0:
+            break
+
+        if length > max_code_length:
+            if length < min_length:
+                continue
+            for position in positions.tolist():
+                entry = long_ngrams.setdefault(tuple(ids[position:position + length].tolist()), [0, first + position])
+                entry[0] += 1
+            continue
+
+        codes = codes * num_symbols + ids[positions + length - 1]
+        if length >= min_length:
+            unique, index, ngram_counts = np.unique(codes, return_index=True, return_counts=True)
+            counts[length] = (unique, ngram_counts, first + positions[index])
+
+    return counts, long_ngrams
+
+
+def _attach_shared_corpus(name, num_ids, num_offsets, args):
+    shm = SharedMemory(name=name)
+    ids = np.ndarray((num_ids,), dtype=np.int64, buffer=shm.buf)
+    offsets = np.ndarray((num_offsets,), dtype=np.int64, buffer=shm.buf, offset=ids.nbytes)
+    # keep a reference to the shared memory, which must stay open as long as the arrays are used
+    set_worker_state({"shm": shm, "ids": ids, "offsets": offsets, "args": args})
+
+
+def _count_shared_shards(shards):
+    ids, offsets, args = get_worker_state("ids"), get_worker_state("offsets"), get_worker_state("args")
+    return [_count_shard(ids, offsets, start, end, *args) for start, end in shards]
+
+
+def _merge(partials):
+    """
+    Merge the partial counts of all shards.
+    """
+    codes = collections.defaultdict(list)
+    long_ngrams = {}
+    for partial_codes, partial_long_ngrams in partials:
+        for length, value in partial_codes.items():
+            codes[length].append(value)
+        for ngram, (count, position) in partial_long_ngrams.items():
+            entry = long_ngrams.setdefault(ngram, [0, position])
+            entry[0] += count
+            entry[1] = min(entry[1], position)
+
+    merged = {}
+    for length, values in codes.items():
+        all_codes, all_counts, all_positions = (np.concatenate(arrays) for arrays in zip(*values))
+        order = np.argsort(all_codes, kind="stable")
+        all_codes, all_counts, all_positions = all_codes[order], all_counts[order], all_positions[order]
+        starts = np.flatnonzero(np.r_[True, all_codes[1:] != all_codes[:-1]])
+        merged[length] = (
+            all_codes[starts],
+            np.add.reduceat(all_counts, starts),
+            np.minimum.reduceat(all_positions, starts)
+        )
+
+    return merged, long_ngrams
+
+
+def _decode(codes, length, num_symbols):
+    """
+    Turn the integer codes of n-grams of the given length into a matrix of symbol ids.
+    """
+    digits = np.empty((len(codes), length), dtype=np.int64)
+    for i in range(length - 1, -1, -1):
+        codes, digits[:, i] = np.divmod(codes, num_symbols)
+    return digits
+
+
+def count_ngrams(words, min_length=1, max_length=None, n_jobs=1, num_shards=None):
+    """
+    Count all contiguous n-grams of `min_length` to `max_length` symbols within the given words.
+
+    :param words: an iterable of sequences of hashable symbols, e.g. the forms of a WordlistWrapper.
+    :param min_length: the minimal length of the n-grams.
+    :param max_length: the maximal length of the n-grams (by default, the length of the longest word).
+    :param n_jobs: the number of worker processes (negative values count back from the number of CPUs).
+    :param num_shards: the number of shards (by default, four per worker).
+    :return: a dictionary from tuples of symbols to their counts, in the order of their first occurrence.
+    """
+    corpus = words if isinstance(words, InternedCorpus) else InternedCorpus(words)
+    if max_length is None:
+        max_length = int(np.diff(corpus.offsets).max(initial=0))
+
+    n_jobs = resolve_n_jobs(n_jobs)
+    shards = corpus.shards(num_shards or 4 * n_jobs)
+    args = (min_length, max_length, max(len(corpus.symbols), 1), corpus.max_code_length())
+
+    if n_jobs == 1 or len(shards) < 2:
+        partials = [_count_shard(corpus.ids, corpus.offsets, start, end, *args) for start, end in shards]
+    else:
+        shm = SharedMemory(create=True, size=max(corpus.ids.nbytes + corpus.offsets.nbytes, 1))
+        try:
+            ids = np.ndarray(corpus.ids.shape, dtype=np.int64, buffer=shm.buf)
+            offsets = np.ndarray(corpus.offsets.shape, dtype=np.int64, buffer=shm.buf, offset=ids.nbytes)
+            ids[:], offsets[:] = corpus.ids, corpus.offsets
+
+            partials = []
+            for chunk in imap_chunks(
+                    _count_shared_shards,
+                    shards,
+                    n_jobs=n_jobs,
+                    chunk_size=1,
+                    initializer=_attach_shared_corpus,
+                    initargs=(shm.name, len(ids), len(offsets), args)
+            ):
+                partials.extend(chunk)
+            del ids, offsets
+        finally:
+            shm.close()
+            shm.unlink()
+
+    merged, long_ngrams = _merge(partials)
+    symbols = corpus.symbols
+    entries = []
+
+    for length, (codes, ngram_counts, positions) in merged.items():
+        ngrams = _decode(codes, length, args[2]).tolist()
+        entries.extend(zip(positions.tolist(), itertools.repeat(length), ngrams, ngram_counts.tolist()))
+    for ngram, (count, position) in long_ngrams.items():
+        entries.append((position, len(ngram), ngram, count))
+
+    # order the n-grams by their first occurrence (and by length), as a serial count would
+    entries.sort(key=lambda entry: entry[:2])
+    return {tuple(symbols[i] for i in ngram): count for _, _, ngram, count in entries}
+
+
+def count_unigrams(words, n_jobs=1, num_shards=None):
+    """
+    Count the symbols of the given words.
+    """
+    counts = count_ngrams(words, min_length=1, max_length=1, n_jobs=n_jobs, num_shards=num_shards)
+    return {ngram[0]: count for ngram, count in counts.items()}
+
+
+def count_bigrams(words, n_jobs=1, num_shards=None):
+    """
+    Count the pairs of adjacent symbols within the given words.
+    """
+    return count_ngrams(words, min_length=2, max_length=2, n_jobs=n_jobs, num_shards=num_shards)
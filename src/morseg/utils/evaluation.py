@@ -0,0 +1,202 @@
+"""
+Confidence intervals and significance tests for segmentation scores.
+
+The number of correctly predicted, predicted and gold morpheme boundaries of every word are computed once and
+stored as NumPy arrays. Bootstrap samples are drawn as weight matrices over the words, so that the boundary
+counts of a whole batch of samples come out of one matrix product. Batches are drawn from independent random
+streams, which makes the results reproducible for a given seed, regardless of the number of worker processes.
+
+Usage:
+>>> result = bootstrap_scores(model.forms, num_samples=10000)
+>>> print(result.f1.estimate, result.f1.low, result.f1.high)
+>>> paired_test(model_a.forms, model_b.forms).p_value
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from morseg.utils.parallel import imap_chunks, set_worker_state, get_worker_state
+
+
+Interval = namedtuple("Interval", ["estimate", "low", "high"])
+BootstrapResult = namedtuple("BootstrapResult", ["f1", "precision", "recall"])
+PairedTestResult = namedtuple("PairedTestResult", ["difference", "low", "high", "p_value"])
+
+METRICS = ["f1", "precision", "recall"]
+
+# the number of cells of the weight matrix of one batch of samples
+_BATCH_CELLS = 2 ** 22
+
+
+class SegmentationCounts(object):
+    """
+    The number of correct (`tp`), predicted and gold morpheme boundaries of every word, as integer arrays.
+    """
+    def __init__(self, tp, pred, gold):
+        self.tp = np.asarray(tp, dtype=np.int64)
+        self.pred = np.asarray(pred, dtype=np.int64)
+        self.gold = np.asarray(gold, dtype=np.int64)
+        self.forms = None
+
+    @classmethod
+    def from_forms(cls, forms, ignore_token=None):
+        """
+        Count the boundaries of segmented forms (WordWrapper objects), as in `WordlistWrapper.f1_score`.
+        """
+        tp, pred, gold, keys = [], [], [], []
+        for form in forms:
+            pred_splits = form.get_splits(ignore_token=ignore_token)
+            gold_splits = form.get_gold_splits()
+            tp.append(len(set(pred_splits) & set(gold_splits)))
+            pred.append(len(pred_splits))
+            gold.append(len(gold_splits))
+            keys.append(form.unsegmented.key)
+
+        counts = cls(tp, pred, gold)
+        counts.forms = keys
+        return counts
+
+    def __len__(self):
+        return len(self.tp)
+
+    def matrix(self):
+        return np.stack([self.tp, self.pred, self.gold]).astype(np.float64)
+
+    def scores(self):
+        """
+        Return F1 score, precision and recall over all words.
+        """
+        f1, precision, recall = _scores(self.matrix().sum(axis=1)[None, :])
+        return float(f1[0]), float(precision[0]), float(recall[0])
+
+
+def _counts(forms, ignore_token=None):
+    if isinstance(forms, SegmentationCounts):
+        return forms
+    return SegmentationCounts.from_forms(forms, ignore_token=ignore_token)
+
+
+def _scores(sums):
+    """
+    Compute F1 score, precision and recall from an array of (tp, pred, gold) sums with one row per sample.
+    """
+    tp, pred, gold = sums[:, 0], sums[:, 1], sums[:, 2]
+    precision = np.divide(tp, pred, out=np.zeros(len(tp)), where=pred > 0)
+    recall = np.divide(tp, gold, out=np.zeros(len(tp)), where=gold > 0)
+    total = precision + recall
+    f1 = np.divide(2 * precision * recall, total, out=np.zeros(len(tp)), where=total > 0)
+    return f1, precision, recall
+
+
+def _resample(matrix, seed, num_samples, method):
+    """
+    Draw `num_samples` samples and return the sums of the rows of `matrix` per sample.
+    """
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[1]
+
+    if method == "bootstrap":
+        # how often every word is drawn in every sample
+        indices = rng.integers(0, n, size=(num_samples, n)) + (np.arange(num_samples) * n)[:, None]
+        weights = np.bincount(indices.ravel(), minlength=num_samples * n).reshape(num_samples, n)
+        return weights.astype(np.float64) @ matrix.T
+
+    # permutation: swap the counts of the two systems for a random half of the words
+    swap = (rng.random((num_samples, n)) < 0.5).astype(np.float64)
+    a, b = matrix[:3], matrix[3:]
+    return np.hstack([(1 - swap) @ a.T + swap @ b.T, swap @ a.T + (1 - swap) @ b.T])
+
+
+def _resample_chunk(tasks):
+    matrix = get_worker_state("matrix")
+    return [_resample(matrix, seed, num_samples, method) for seed, num_samples, method in tasks]
+
+
+def _draw(matrix, num_samples, seed, method, n_jobs, chunk_size):
+    """
+    Draw samples in batches of `chunk_size`, distributed over `n_jobs` worker processes.
+    """
+    if num_samples < 1:
+        raise ValueError("The number of samples must be a positive integer.")
+    chunk_size = chunk_size or max(1, _BATCH_CELLS // matrix.shape[1])
+    sizes = [min(chunk_size, num_samples - start) for start in range(0, num_samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, size, method) for s, size in zip(seeds, sizes)]
+
+    results = imap_chunks(_resample_chunk, tasks, n_jobs=n_jobs, chunk_size=1,
+                          initializer=set_worker_state, initargs=({"matrix": matrix},))
+    return np.vstack([batch for chunk in results for batch in chunk])
+
+
+def _interval(estimate, samples, confidence):
+    low, high = np.quantile(samples, [(1 - confidence) / 2, 1 - (1 - confidence) / 2])
+    return Interval(estimate, float(low), float(high))
+
+
+def bootstrap_scores(forms, num_samples=1000, confidence=0.95, seed=0, n_jobs=1, chunk_size=None,
+                     ignore_token=None) -> BootstrapResult:
+    """
+    Estimate percentile bootstrap confidence intervals of F1 score, precision and recall, by resampling words.
+
+    :param forms: the segmented forms (e.g. `model.forms`), or their SegmentationCounts.
+    :param num_samples: the number of bootstrap samples.
+    :param confidence: the confidence level of the intervals.
+    :param seed: the seed for drawing the samples.
+    :param n_jobs: the number of worker processes.
+    :param chunk_size: the number of samples drawn at once (by default, depending on the number of words).
+    :param ignore_token: a token to ignore when counting predicted boundaries, e.g. the WordPiece prefix.
+    """
+    counts = _counts(forms, ignore_token=ignore_token)
+    if len(counts) == 0:
+        raise ValueError("There are no words to evaluate.")
+
+    samples = _scores(_draw(counts.matrix(), num_samples, seed, "bootstrap", n_jobs, chunk_size))
+    return BootstrapResult(*(_interval(estimate, metric_samples, confidence)
+                             for estimate, metric_samples in zip(counts.scores(), samples)))
+
+
+def paired_test(forms_a, forms_b, metric="f1", method="bootstrap", num_samples=1000, confidence=0.95, seed=0,
+                n_jobs=1, chunk_size=None, ignore_token=None) -> PairedTestResult:
+    """
+    Test whether the difference in `metric` between two segmentations of the same words is significant.
+
+    With method "bootstrap", words are resampled for both segmentations at once; the p-value is the share of
+    samples whose difference deviates from the observed difference by at least the observed difference, and a
+    confidence interval of the difference is returned. With method "permutation" (approximate randomization),
+    the segmentations of a random half of the words are swapped between the two systems; the p-value is the
+    share of samples with at least the observed absolute difference, and no interval is returned.
+
+    :return: the observed difference (a - b), the bounds of its confidence interval and the two-sided p-value.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Invalid metric: '{metric}'")
+    if method not in ("bootstrap", "permutation"):
+        raise ValueError(f"Invalid method: '{method}'")
+
+    counts_a = _counts(forms_a, ignore_token=ignore_token)
+    counts_b = _counts(forms_b, ignore_token=ignore_token)
+    if len(counts_a) != len(counts_b):
+        raise ValueError("Both segmentations must cover the same words.")
+    if counts_a.forms is not None and counts_b.forms is not None and counts_a.forms != counts_b.forms:
+        raise ValueError("Both segmentations must cover the same words, in the same order.")
+    if len(counts_a) == 0:
+        raise ValueError("There are no words to evaluate.")
+
+    index = METRICS.index(metric)
+    difference = counts_a.scores()[index] - counts_b.scores()[index]
+
+    matrix = np.vstack([counts_a.matrix(), counts_b.matrix()])
+    sums = _draw(matrix, num_samples, seed, method, n_jobs, chunk_size)
+    differences = _scores(sums[:, :3])[index] - _scores(sums[:, 3:])[index]
+
+    if method == "bootstrap":
+        extreme = np.abs(differences - difference) >= abs(difference)
+        interval = _interval(difference, differences, confidence)
+        low, high = interval.low, interval.high
+    else:
+        # compare with a small tolerance, so that sums in a different order still count as equal
+        extreme = np.abs(differences) >= abs(difference) - 1e-12
+        low = high = None
+
+    p_value = (int(extreme.sum()) + 1) / (num_samples + 1)
+    return PairedTestResult(difference, low, high, p_value)
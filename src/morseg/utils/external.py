@@ -0,0 +1,239 @@
+"""
+Out-of-core counting for corpora whose n-gram tables do not fit into memory.
+
+Counts are collected in memory until a fixed number of distinct keys is reached. Then they are sorted and
+spilled to a temporary file (a "run"). When counting is done, all runs are merged in one streaming k-way merge,
+which yields every key with its total count, in sorted order. Every key is also tagged with the position of its
+first occurrence, so that the merged counts can be sorted back into the order of a serial count (with another
+round of spilled runs), which keeps the results of out-of-core training identical to those in memory. Memory use
+is therefore bounded by `max_entries` (and by `max_open_files` batches during the merge), not by the size of the
+corpus.
+
+Usage, with a corpus that is read one form at a time:
+>>> forms = WordlistWrapper.iter_file("corpus.tsv")
+>>> words = (form_key(form) for form in forms)
+>>> for ngram, count in count_ngrams_external(words, max_length=5, max_entries=10 ** 6):
+...     ...
+"""
+import heapq
+import itertools
+import operator
+import os
+import pickle
+import shutil
+import tempfile
+
+
+# the number of (key, count) pairs that are pickled and read together
+_BATCH_SIZE = 10000
+
+
+def _write_run(items, directory):
+    """
+    Write sorted (key, count, first occurrence) triples to a new temporary file and return its path.
+    """
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        iterator = iter(items)
+        while True:
+            batch = list(itertools.islice(iterator, _BATCH_SIZE))
+            if not batch:
+                break
+            pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def _merge_sorted(*iterables):
+    """
+    Merge sorted streams of (key, count, first occurrence) triples, adding up the counts of equal keys.
+    """
+    merged = heapq.merge(*iterables, key=operator.itemgetter(0))
+    for key, group in itertools.groupby(merged, key=operator.itemgetter(0)):
+        group = list(group)
+        yield key, sum(entry[1] for entry in group), min(entry[2] for entry in group)
+
+
+def _merge_runs(runs, directory, max_open_files, merge, **kwargs):
+    """
+    Reduce the number of runs, so that no more than `max_open_files` files are open at once, and merge them.
+    """
+    while len(runs) > max_open_files:
+        group, runs = runs[:max_open_files], runs[max_open_files:]
+        runs.append(_write_run(merge(*[_read_run(path) for path in group], **kwargs), directory))
+        for path in group:
+            os.remove(path)
+
+    return runs, [_read_run(path) for path in runs]
+
+
+class ExternalCounter(object):
+    """
+    A counter of hashable and orderable keys (e.g. tuples of segments) that spills to disk.
+
+    :param max_entries: the maximal number of distinct keys that are counted in memory; when more keys occur,
+        the counts are sorted and written to a temporary file.
+    :param directory: the directory for the temporary files (by default, the system's temporary directory).
+    :param max_open_files: the maximal number of runs that are merged at once; if there are more runs, they are
+        first merged into fewer, larger runs.
+    """
+    def __init__(self, max_entries=10 ** 6, directory=None, max_open_files=64):
+        if max_entries < 1:
+            raise ValueError("The maximal number of entries must be a positive integer.")
+        if max_open_files < 2:
+            raise ValueError("At least two files have to be merged at once.")
+
+        self.max_entries = max_entries
+        self.max_open_files = max_open_files
+        self.counts = {}
+        self.runs = []
+        self._directory = directory
+        self._tmp_dir = None
+        self._num_added = 0
+
+    def add(self, key, count=1):
+        entry = self.counts.get(key)
+        if entry is None:
+            self.counts[key] = [count, self._num_added]
+        else:
+            entry[0] += count
+        self._num_added += 1
+        if len(self.counts) >= self.max_entries:
+            self.spill()
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def spill(self):
+        """
+        Write the counts in memory to a new run.
+        """
+        if not self.counts:
+            return
+        self.runs.append(_write_run(self._sorted_counts(), self._get_tmp_dir()))
+        self.counts = {}
+
+    def _get_tmp_dir(self):
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="morseg-", dir=self._directory)
+        return self._tmp_dir
+
+    def _sorted_counts(self):
+        return [(key, count, first) for key, (count, first) in sorted(self.counts.items())]
+
+    def _merged(self):
+        self.runs, streams = _merge_runs(self.runs, self._tmp_dir, self.max_open_files, _merge_sorted)
+        return _merge_sorted(*streams, self._sorted_counts())
+
+    def items(self, order="key"):
+        """
+        Yield all keys with their total counts.
+
+        :param order: "key" for sorted order, or "first" for the order in which the keys were first added
+            (as in a `collections.Counter`). The latter sorts the merged counts once more, in runs of
+            `max_entries` keys.
+        """
+        if order == "key":
+            yield from ((key, count) for key, count, _ in self._merged())
+            return
+        if order != "first":
+            raise ValueError(f"Invalid order: '{order}'")
+
+        runs = []
+        in_memory = []
+        by_first = operator.itemgetter(2)
+        for entry in self._merged():
+            in_memory.append(entry)
+            if len(in_memory) >= self.max_entries:
+                runs.append(_write_run(sorted(in_memory, key=by_first), self._get_tmp_dir()))
+                in_memory = []
+
+        in_memory.sort(key=by_first)
+        runs, streams = _merge_runs(runs, self._tmp_dir, self.max_open_files, heapq.merge, key=by_first)
+        for key, count, _ in heapq.merge(*streams, in_memory, key=by_first):
+            yield key, count
+
+    def close(self):
+        """
+        Delete the temporary files.
+        """
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+        self.runs = []
+        self.counts = {}
+        self._num_added = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def iter_ngrams(word, min_length=1, max_length=None):
+    """
+    Yield all contiguous n-grams of `min_length` to `max_length` symbols of a word, as tuples.
+    """
+    word = tuple(word)
+    max_length = max_length or len(word)
+    for i in range(len(word)):
+        for j in range(i + min_length, min(i + max_length, len(word)) + 1):
+            yield word[i:j]
+
+
+def count_ngrams_external(words, min_length=1, max_length=None, max_entries=10 ** 6, directory=None,
+                          max_open_files=64):
+    """
+    Count the n-grams of a stream of words with bounded memory (see `ExternalCounter`).
+
+    :param words: an iterable of sequences of symbols, which is consumed once.
+    :return: a generator of (n-gram, count) pairs, in the order of their first occurrence (as a count in memory
+        would return them). The temporary files are deleted when the generator is exhausted or closed.
+    """
+    counter = ExternalCounter(max_entries=max_entries, directory=directory, max_open_files=max_open_files)
+    try:
+        for word in words:
+            counter.update(iter_ngrams(word, min_length=min_length, max_length=max_length))
+        yield from counter.items(order="first")
+    finally:
+        counter.close()
+
+
+def count_bigrams_external(words, **kwargs):
+    """
+    Count the pairs of adjacent symbols of a stream of words with bounded memory.
+    """
+    return count_ngrams_external(words, min_length=2, max_length=2, **kwargs)
+
+
+def most_frequent(items, k, keep=None):
+    """
+    Select the `k` most frequent keys from a stream of (key, count) pairs, holding at most `k` of them in
+    memory, plus all keys for which `keep(key)` is true.
+
+    :return: a dictionary from keys to counts.
+    """
+    kept = {}
+    heap = []
+    for i, (key, count) in enumerate(items):
+        if keep is not None and keep(key):
+            kept[key] = count
+        elif len(heap) < k:
+            # the index breaks ties in favour of earlier keys, and avoids comparing keys
+            heapq.heappush(heap, (count, -i, key))
+        elif heap and (count, -i) > heap[0][:2]:
+            heapq.heapreplace(heap, (count, -i, key))
+
+    kept.update((key, count) for count, _, key in sorted(heap, reverse=True))
+    return kept
@@ -0,0 +1,120 @@
+"""
+Opt-in measurements of where training spends its time and memory.
+"""
+import contextlib
+import json
+import time
+import tracemalloc
+
+
+class PhaseStats(object):
+    """
+    Wall-clock time, CPU time and peak memory of one training phase, and the timing of its iterations.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.wall = None
+        self.cpu = None
+        self.peak_memory = None
+        self.iterations = []
+
+    def throughput(self):
+        """
+        Return the number of processed items (e.g. merges or words) per second of iteration time, per item type.
+        """
+        wall = sum(iteration["wall"] for iteration in self.iterations)
+        totals = {}
+        for iteration in self.iterations:
+            for key, value in iteration.items():
+                if key != "wall":
+                    totals[key] = totals.get(key, 0) + value
+
+        return {f"{key}/s": value / wall if wall > 0 else None for key, value in totals.items()}
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "peak_memory": self.peak_memory,
+            "num_iterations": len(self.iterations),
+            "throughput": self.throughput(),
+            "iterations": self.iterations
+        }
+
+
+class TrainingStats(object):
+    """
+    Per-phase statistics of a training run, as collected by `Tokenizer.train(words, instrument=True)`.
+
+    Usage:
+    >>> model.train(wl, instrument=True)
+    >>> print(model.training_stats.phases["train"].throughput())
+    >>> model.training_stats.to_json("stats.json")
+
+    :param trace_memory: whether to measure the peak memory of every phase with tracemalloc. Tracing slows
+        down training considerably, so that timings are only comparable between runs with the same setting.
+    """
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self._current = None
+        self._last_iteration = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        stats = self.phases[name] = PhaseStats(name)
+        self._current = stats
+
+        started_tracing = False
+        if self.trace_memory:
+            # do not interfere with tracing that was started elsewhere
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        cpu = time.process_time()
+        wall = self._last_iteration = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.wall = time.perf_counter() - wall
+            stats.cpu = time.process_time() - cpu
+            if self.trace_memory:
+                stats.peak_memory = tracemalloc.get_traced_memory()[1] - baseline
+                if started_tracing:
+                    tracemalloc.stop()
+            self._current = None
+
+    def iteration(self, **counts):
+        """
+        Mark the end of an iteration of the current phase, with the number of items it processed, e.g.
+        `iteration(merges=1, words=len(wordlist))`.
+        """
+        if self._current is None:
+            return
+
+        now = time.perf_counter()
+        self._current.iterations.append({"wall": now - self._last_iteration, **counts})
+        self._last_iteration = now
+
+    def to_dict(self):
+        return {
+            "wall": sum(phase.wall or 0 for phase in self.phases.values()),
+            "cpu": sum(phase.cpu or 0 for phase in self.phases.values()),
+            "phases": [phase.to_dict() for phase in self.phases.values()]
+        }
+
+    def to_json(self, path=None):
+        """
+        Return the statistics as a JSON string, or write them to a file if a path is given.
+        """
+        data = json.dumps(self.to_dict(), indent=2)
+        if path is None:
+            return data
+
+        with open(path, "w") as f:
+            f.write(data)
@@ -0,0 +1,193 @@
+"""
+Helpers for distributing work over a pool of worker processes.
+"""
+import collections
+import contextlib
+import itertools
+import os
+
+
+# state that is set up once per worker process (e.g. a trained model), instead of being sent with every task
+_worker_state = {}
+
+
+def set_worker_state(state: dict):
+    _worker_state.clear()
+    _worker_state.update(state)
+
+
+def get_worker_state(key):
+    return _worker_state[key]
+
+
+@contextlib.contextmanager
+def saved_worker_state():
+    """
+    Restore the current worker state on exit, so that state set up within the block (e.g. by nested calls of
+    `imap_chunks`) does not replace it.
+    """
+    saved = dict(_worker_state)
+    try:
+        yield
+    finally:
+        set_worker_state(saved)
+
+
+def resolve_n_jobs(n_jobs):
+    """
+    Translate an `n_jobs` setting into a number of processes. Negative values count back from the number of CPUs,
+    so that -1 uses all of them.
+    """
+    if not n_jobs:
+        return 1
+
+    if n_jobs < 0:
+        n_jobs = (os.cpu_count() or 1) + 1 + n_jobs
+
+    return max(n_jobs, 1)
+
+
+def chunked(iterable, chunk_size):
+    """
+    Lazily split an iterable into lists of at most `chunk_size` items.
+    """
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be a positive integer.")
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap_chunks(func, iterable, n_jobs=1, chunk_size=1000, max_pending=None, initializer=None, initargs=(),
+                ordered=True):
+    """
+    Apply `func` to consecutive chunks of `iterable` and yield the results chunk by chunk, in input order (or,
+    with `ordered=False`, as soon as they are done).
+
+    With `n_jobs > 1`, chunks are distributed over a pool of worker processes. At most `max_pending` chunks
+    (by default twice the number of workers) are submitted at once, so the input is consumed only as fast as
+    results are taken from the generator. `initializer` is called with `initargs` once in every worker. With
+    `n_jobs == 1`, `func` runs in the current process and `initializer` is called before every chunk, with the
+    previous worker state restored afterwards, so that several of these generators can be consumed alternately
+    or nested (e.g. a task that segments words with `tokenize_batch`).
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    chunks = chunked(iterable, chunk_size)
+
+    if n_jobs == 1:
+        for chunk in chunks:
+            with saved_worker_state():
+                if initializer:
+                    initializer(*initargs)
+                result = func(chunk)
+            yield result
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    max_pending = max_pending or 2 * n_jobs
+    if not ordered:
+        yield from _imap_chunks_unordered(func, chunks, n_jobs, max_pending, initializer, initargs)
+        return
+
+    pending = collections.deque()
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=initializer, initargs=initargs) as executor:
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _imap_chunks_unordered(func, chunks, n_jobs, max_pending, initializer, initargs):
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    pending = set()
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=initializer, initargs=initargs) as executor:
+        for chunk in chunks:
+            pending.add(executor.submit(func, chunk))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def _serve_shard(func, shard, connection):
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        try:
+            connection.send((True, func(shard, message)))
+        except Exception as e:
+            connection.send((False, e))
+    connection.close()
+
+
+class ShardedWorkers(object):
+    """
+    A group of worker processes, each of which holds one shard of the data for its whole lifetime (e.g. the words
+    of an iterative training run). The shards are sent to the workers once, when they are started; every call of
+    `map` only sends a message to all workers, which call `func(shard, message)` (and may update their shard in
+    place) and send back the result.
+    """
+    def __init__(self, func, shards):
+        import multiprocessing
+
+        self._connections = []
+        self._processes = []
+        try:
+            for shard in shards:
+                connection, child_connection = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_serve_shard, args=(func, shard, child_connection),
+                                                  daemon=True)
+                process.start()
+                child_connection.close()
+                self._connections.append(connection)
+                self._processes.append(process)
+        except BaseException:
+            self.close()
+            raise
+
+    def map(self, message):
+        """
+        Send a message to all workers and return their results, in the order of the shards.
+        """
+        for connection in self._connections:
+            connection.send(message)
+
+        results = [connection.recv() for connection in self._connections]
+        for success, result in results:
+            if not success:
+                raise result
+        return [result for _, result in results]
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass  # the worker has already exited
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections, self._processes = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
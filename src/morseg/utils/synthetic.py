@@ -0,0 +1,96 @@
+"""
+Deterministic generation of synthetic wordlists with gold segmentations, for benchmarks and scaling experiments.
+"""
+import itertools
+import random
+
+from morseg.utils.wrappers import WordlistWrapper
+
+
+CONSONANTS = ["p", "t", "k", "b", "d", "g", "m", "n", "s", "f", "l", "r", "ʃ", "x", "ts"]
+VOWELS = ["a", "e", "i", "o", "u", "ə"]
+
+
+def _morpheme_inventory(rng, size, min_length, max_length, exclude=()):
+    """
+    Create `size` distinct morphemes of alternating consonants and vowels.
+    """
+    morphemes = []
+    seen = set(exclude)
+    max_attempts = 100 * size
+    attempts = 0
+
+    while len(morphemes) < size:
+        attempts += 1
+        if attempts > max_attempts:
+            raise ValueError(f"Could not generate {size} distinct morphemes of length {min_length} to {max_length}.")
+
+        length = rng.randint(min_length, max_length)
+        start = rng.randrange(2)
+        morpheme = tuple(rng.choice(VOWELS if (start + i) % 2 else CONSONANTS) for i in range(length))
+        if morpheme not in seen:
+            seen.add(morpheme)
+            morphemes.append(morpheme)
+
+    return morphemes
+
+
+def _zipf_weights(size, exponent):
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+def zipf_wordlist(
+        num_words,
+        num_roots=None,
+        num_prefixes=20,
+        num_suffixes=50,
+        max_prefixes=1,
+        max_suffixes=2,
+        exponent=1.0,
+        seed=0
+) -> WordlistWrapper:
+    """
+    Generate a wordlist of distinct words, each consisting of up to `max_prefixes` prefixes, a root and up to
+    `max_suffixes` suffixes. Roots and affixes are drawn from fixed inventories with Zipf-distributed
+    frequencies, so that, as in natural wordlists, few morphemes are very frequent and most are rare.
+    The gold segmentation of every word marks its morpheme boundaries.
+
+    The same arguments always produce the same wordlist.
+
+    :param num_words: the number of words.
+    :param num_roots: the size of the root inventory (by default a fifth of the number of words).
+    :param num_prefixes: the size of the prefix inventory.
+    :param num_suffixes: the size of the suffix inventory.
+    :param max_prefixes: the maximal number of prefixes per word.
+    :param max_suffixes: the maximal number of suffixes per word.
+    :param exponent: the exponent of the Zipf distribution.
+    :param seed: the seed of the random number generator.
+    """
+    rng = random.Random(seed)
+    num_roots = num_roots or max(num_words // 5, 10)
+
+    prefixes = _morpheme_inventory(rng, num_prefixes, 1, 3)
+    suffixes = _morpheme_inventory(rng, num_suffixes, 1, 3, exclude=prefixes)
+    roots = _morpheme_inventory(rng, num_roots, 2, 6, exclude=prefixes + suffixes)
+    weights = [_zipf_weights(len(inventory), exponent) for inventory in (prefixes, roots, suffixes)]
+
+    def draw(inventory, cum_weights, k):
+        return rng.choices(inventory, cum_weights=cum_weights, k=k) if inventory else []
+
+    words = {}
+    max_attempts = 20 * num_words
+    attempts = 0
+
+    while len(words) < num_words:
+        attempts += 1
+        if attempts > max_attempts:
+            raise ValueError(f"Could not generate {num_words} distinct words; increase the inventory sizes.")
+
+        morphemes = (draw(prefixes, weights[0], rng.randint(0, max_prefixes)) + draw(roots, weights[1], 1)
+                     + draw(suffixes, weights[2], rng.randint(0, max_suffixes)))
+        # the same form can arise from different segmentations; keep the first one
+        form = tuple(segment for morpheme in morphemes for segment in morpheme)
+        if form not in words:
+            words[form] = [list(morpheme) for morpheme in morphemes]
+
+    return WordlistWrapper(list(words.values()))
@@ -1,8 +1,44 @@
 from __future__ import annotations
 
+import sys
 from collections import defaultdict
 from csv import DictReader
 from linse.typedsequence import Word, Morpheme
+from morseg.utils.parallel import resolve_n_jobs
+
+
+def form_key(word) -> tuple:
+    """
+    Return the unsegmented form of a word as a flat tuple of interned segments.
+    Words with the same segments map to the same key, regardless of their segmentation.
+    """
+    return tuple(sys.intern(str(segment)) for morpheme in word for segment in morpheme)
+
+
+class Form(Word):
+    """
+    An unsegmented word form, as used for lookups. Its hash (the same as that of an equal `Word`) and its
+    `form_key` are computed once, on first use, so forms must not be modified.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hash = None
+        self._key = None
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = super().__hash__()
+        return self._hash
+
+    @property
+    def key(self) -> tuple:
+        if self._key is None:
+            self._key = form_key(self)
+        return self._key
+
+    def __reduce__(self):
+        # string hashes differ between processes, so the cached hash must not be pickled
+        return Form, (Word(self),)
 
 
 class WordWrapper(Word):
@@ -30,12 +66,20 @@ class WordWrapper(Word):
             super().__init__(tokens, **kwargs)
         else:
             self.gold_segmented = Word(tokens)
-            self.unsegmented = Word(sum(self.gold_segmented))
+            self.unsegmented = Form(sum(self.gold_segmented))
             self.num_tokens = len(self.unsegmented[0])
             super().__init__(sum(self.gold_segmented), **kwargs)
 
     def copy(self) -> WordWrapper:
-        return WordWrapper(self)
+        """
+        Return a copy with its own predicted segmentation. The gold standard and unsegmented forms are shared,
+        and so are the morphemes, which are never modified in place: operations that change a morpheme replace
+        it with a new one (copy-on-write).
+        """
+        word = WordWrapper.__new__(WordWrapper)
+        list.__init__(word, self)
+        word.__dict__.update(self.__dict__)
+        return word
 
     def update(self, other):
         super().__init__(other)
@@ -135,12 +179,14 @@ class WordWrapper(Word):
 
     def add_wp_token(self, wp_token="##"):
         for i in range(1, len(self)):
-            self[i].insert(0, wp_token)
+            self[i] = Morpheme([wp_token]) + self[i]
 
     def remove_wp_token(self, wp_token="##"):
         for i in range(1, len(self)):
             if wp_token in self[i]:
-                self[i].remove(wp_token)
+                morpheme = Morpheme(self[i])  # copy, the morpheme might be shared with other words
+                morpheme.remove(wp_token)
+                self[i] = morpheme
 
     def __eq__(self, other):
         if type(other) is not WordWrapper:
@@ -149,7 +195,18 @@ class WordWrapper(Word):
         return super().__eq__(other) and self.gold_segmented == other.gold_segmented
 
     def __hash__(self):
-        return hash(repr(self))
+        # equal words have equal unsegmented forms, whose hash is cached
+        return hash(self.unsegmented)
+
+    def __reduce__(self):
+        # the default protocol restores list items through `extend`, which would re-wrap them as a new WordWrapper
+        return _restore_word_wrapper, (self.gold_segmented, Word(self))
+
+
+def _restore_word_wrapper(gold_segmented, segmented):
+    word = WordWrapper(gold_segmented)
+    word.update(segmented)
+    return word
 
 
 class WordlistWrapper(list):
@@ -189,14 +246,34 @@ class WordlistWrapper(list):
         """
         if not all(type(f) is WordWrapper for f in forms):
             forms = [WordWrapper(f) for f in forms]
-        self.form_dict = {f.unsegmented: f for f in forms}
         super().__init__(forms)
+        self._form_dict = None
+
+    @property
+    def form_dict(self) -> dict:
+        """
+        The words of the wordlist by their unsegmented form, built on first use.
+        """
+        if self._form_dict is None:
+            self._form_dict = {f.unsegmented.key: f for f in self}
+        return self._form_dict
 
     def copy(self) -> WordlistWrapper:
-        return WordlistWrapper([word.copy() for word in self])
+        """
+        Return a copy of the wordlist in which every word has its own predicted segmentation, while all
+        other data is shared with this wordlist (see `WordWrapper.copy`).
+        """
+        wl = WordlistWrapper.__new__(WordlistWrapper)
+        list.__init__(wl, [word.copy() for word in self])
+        wl._form_dict = None
+        return wl
 
     def __getitem__(self, item):
+        if type(item) is Form:
+            return self.form_dict.get(item.key)
         if type(item) is Word:
+            return self.form_dict.get(form_key(item))
+        if type(item) is tuple:
             return self.form_dict.get(item)
 
         return super().__getitem__(item)
@@ -225,7 +302,15 @@ class WordlistWrapper(list):
         for x in self:
             x.remove_wp_token(wp_token=wp_token)
 
-    def unigram_counts(self):
+    def unigram_counts(self, n_jobs=1):
+        """
+        Count the morphemes of all forms. With `n_jobs > 1`, the forms are counted in shards, distributed over
+        worker processes (see `morseg.utils.counting`).
+        """
+        if resolve_n_jobs(n_jobs) > 1:
+            from morseg.utils.counting import count_unigrams
+            return defaultdict(int, count_unigrams(self, n_jobs=n_jobs))
+
         vocabulary = defaultdict(int)
         for form in self:
             for m in form:
@@ -233,7 +318,14 @@ class WordlistWrapper(list):
 
         return vocabulary
 
-    def bigram_counts(self):
+    def bigram_counts(self, n_jobs=1):
+        """
+        Count the pairs of adjacent morphemes in all forms, optionally in `n_jobs` worker processes.
+        """
+        if resolve_n_jobs(n_jobs) > 1:
+            from morseg.utils.counting import count_bigrams
+            return defaultdict(int, count_bigrams(self, n_jobs=n_jobs))
+
         vocabulary = defaultdict(int)
         for form in self:
             for i in range(len(form) - 1):
@@ -275,6 +367,39 @@ class WordlistWrapper(list):
 
         return cls(forms)
 
+    @classmethod
+    def from_multilingual_file(cls, fp, language_col="DOCULECT", col_name="TOKENS", delimiter="\t",
+                               underlying=False) -> dict:
+        """
+        Read a multilingual wordlist in one pass and partition its forms by the values in `language_col`.
+        :return: a dictionary from languages to their wordlists, in the order in which the languages occur.
+        """
+        forms = defaultdict(dict)
+
+        with open(fp) as f:
+            reader = DictReader(f, delimiter=delimiter)
+            for line in reader:
+                form = line[col_name]
+                if form:
+                    # a dictionary keeps the first occurrence of every form, in order
+                    forms[line[language_col]].setdefault(form)
+
+        return {language: cls(cls.preprocess(list(language_forms), underlying=underlying))
+                for language, language_forms in forms.items()}
+
+    @classmethod
+    def iter_file(cls, fp, col_name="TOKENS", delimiter="\t", underlying=False):
+        """
+        Lazily read the forms of a file one by one, without building a wordlist in memory.
+        Unlike `from_file`, duplicate forms are not removed.
+        """
+        with open(fp) as f:
+            reader = DictReader(f, delimiter=delimiter)
+            for line in reader:
+                form = line[col_name]
+                if form:
+                    yield cls.preprocess([form], underlying=underlying)[0]
+
     @classmethod
     def preprocess(cls, forms, morpheme_separator=Word.item_separator, underlying=False):
         preprocessed_forms = []
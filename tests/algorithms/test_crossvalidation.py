@@ -0,0 +1,53 @@
+import pytest
+
+from morseg.algorithms.crossvalidation import k_fold_splits, cross_validate
+from morseg.algorithms.tokenizer import LSVTokenizer, PairEncoding
+from morseg.utils.wrappers import WordlistWrapper
+
+
+@pytest.fixture
+def wl(test_data):
+    return WordlistWrapper.from_file(test_data / "german.tsv")
+
+
+def test_k_fold_splits():
+    splits = k_fold_splits(23, k=5, seed=1)
+    assert len(splits) == 5
+    assert sorted(i for _, test in splits for i in test) == list(range(23))
+    for train, test in splits:
+        assert sorted(train + test) == list(range(23))
+        assert len(test) in (4, 5)
+
+    assert k_fold_splits(23, k=5, seed=1) == splits
+    assert k_fold_splits(23, k=5, seed=2) != splits
+
+    with pytest.raises(ValueError):
+        k_fold_splits(3, k=4)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_cross_validate(wl, n_jobs):
+    result = cross_validate(wl, LSVTokenizer, k=4, n_jobs=n_jobs)
+
+    assert [fold.fold for fold in result.folds] == [0, 1, 2, 3]
+    assert sum(fold.test_size for fold in result.folds) == len(wl)
+    assert all(fold.model is None for fold in result.folds)
+
+    # every word is segmented by the model that did not see it in training
+    assert [f.unsegmented for f in result.forms] == [f.unsegmented for f in wl]
+    assert [f.gold_segmented for f in result.forms] == [f.gold_segmented for f in wl]
+    assert tuple(result.pooled) == result.forms.f1_score()
+    assert result.mean.f1 == pytest.approx(sum(fold.scores.f1 for fold in result.folds) / 4)
+
+    # held-out words are harder to segment than training words
+    model = LSVTokenizer()
+    model.train(wl)
+    assert result.pooled.f1 < model.forms.f1_score()[0]
+
+
+def test_cross_validate_models(wl):
+    result = cross_validate(wl, PairEncoding, k=2, return_models=True, iterations=10, threshold=0)
+    for fold in result.folds:
+        assert isinstance(fold.model, PairEncoding)
+        assert len(fold.model.merges) == 10
+        assert len(fold.model.forms) == fold.train_size
@@ -0,0 +1,31 @@
+import pytest
+
+from morseg.algorithms.multilingual import train_per_language
+from morseg.algorithms.tokenizer import LSVTokenizer, PairEncoding
+from morseg.utils.wrappers import WordlistWrapper
+
+
+@pytest.fixture
+def wordlists(test_data):
+    wl = WordlistWrapper.from_file(test_data / "german.tsv")
+    return {"German": wl, "German-20": WordlistWrapper(wl[:20])}
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_train_per_language(wordlists, n_jobs):
+    results = train_per_language(wordlists, LSVTokenizer, n_jobs=n_jobs)
+
+    assert list(results) == ["German", "German-20"]
+    assert results["German"].f1 == pytest.approx(0.6721, abs=0.001)
+
+    model = LSVTokenizer()
+    model.train(wordlists["German-20"])
+    assert results["German-20"].f1 == pytest.approx(model.forms.f1_score()[0])
+    assert list(results["German-20"].model.get_segmentations()) == list(model.get_segmentations())
+
+
+def test_train_per_language_kwargs(wordlists):
+    results = train_per_language(wordlists, PairEncoding, iterations=30)
+    model = PairEncoding()
+    model.train(wordlists["German"], iterations=30)
+    assert results["German"].f1 == pytest.approx(model.forms.f1_score()[0])
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from morseg.algorithms.search import grid, random_trials, run_search, COMPLETED, PRUNED, FAILED
+from morseg.algorithms.tokenizer import LSVTokenizer, PairEncoding, WordPiece
+from morseg.utils.callbacks import EarlyStopping
+from morseg.utils.wrappers import WordlistWrapper
+
+
+@pytest.fixture
+def wl(test_data):
+    return WordlistWrapper.from_file(test_data / "german.tsv")
+
+
+def test_grid():
+    trials = grid(LSVTokenizer, {"iterations": 5}, init_space={"method": ["type", "entropy"], "strategy": ["peak"]})
+    assert [trial.init_params for trial in trials] == [
+        {"method": "type", "strategy": "peak"},
+        {"method": "entropy", "strategy": "peak"}
+    ]
+    assert all(trial.train_params == {"iterations": 5} for trial in trials)
+    assert len(grid(PairEncoding, {"iterations": [1, 2, 3], "threshold": [0, 3]})) == 6
+
+    with pytest.raises(ValueError):
+        grid(PairEncoding, {"iterations": lambda rng: rng.randint(1, 10)})
+
+
+def test_random_trials():
+    space = {"iterations": lambda rng: rng.randint(10, 100), "threshold": [0, 1, 2], "wp_prefix": "##"}
+    trials = random_trials(WordPiece, space, num_trials=5, seed=3)
+
+    assert len(trials) == 5
+    assert all(10 <= trial.train_params["iterations"] <= 100 for trial in trials)
+    assert all(trial.train_params["threshold"] in [0, 1, 2] for trial in trials)
+    assert all(trial.train_params["wp_prefix"] == "##" for trial in trials)
+    assert random_trials(WordPiece, space, num_trials=5, seed=3) == trials
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_run_search(wl, tmp_path, n_jobs):
+    trials = grid(PairEncoding, {"iterations": [10, 200], "threshold": 0})
+    trials += grid(LSVTokenizer, init_space={"strategy": ["peak", "unknown"]})
+    output = tmp_path / "search.jsonl"
+
+    results = run_search(wl, trials, output=output, n_jobs=n_jobs,
+                         early_stopping=EarlyStopping(interval=5, patience=2))
+
+    assert [result.trial for result in results] == [0, 1, 2, 3]
+    assert [result.status for result in results] == [COMPLETED, PRUNED, COMPLETED, FAILED]
+    assert results[1].iterations < 200
+
+    model = PairEncoding()
+    model.train(wl, iterations=10, threshold=0)
+    assert results[0].f1 == model.forms.f1_score()[0]
+
+    model = LSVTokenizer(strategy="peak")
+    model.train(wl)
+    assert results[2].f1 == model.forms.f1_score()[0]
+    assert "unknown" in results[3].error
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record["trial"] for record in records) == [0, 1, 2, 3]
+    assert {record["trial"]: record["status"] for record in records}[1] == PRUNED
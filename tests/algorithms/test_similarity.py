@@ -0,0 +1,131 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from morseg.algorithms.similarity import KhorsiSimilarity
+from morseg.algorithms.pairwise import condensed_size, condensed_to_pairs
+from morseg.utils.wrappers import WordWrapper, WordlistWrapper
+
+
+@pytest.fixture
+def wl(test_data):
+    return WordlistWrapper(WordlistWrapper.from_file(test_data / "german.tsv")[:80])
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1] / max(len(a), len(b), 1)
+
+
+def test_lcs():
+    assert list(KhorsiSimilarity.lcs("abcbdab", "bdcaba")) == list("bdab")
+    assert list(KhorsiSimilarity.lcs("hund", "hunde")) == list("hund")
+    assert list(KhorsiSimilarity.lcs("abc", "xyz")) == []
+
+
+def test_lcs_bitparallel(wl):
+    rng = random.Random(42)
+    for _ in range(500):
+        x = [rng.choice("abcd") for _ in range(rng.randint(0, 12))]
+        y = [rng.choice("abcd") for _ in range(rng.randint(0, 12))]
+        assert list(KhorsiSimilarity.lcs_bitparallel(x, y)) == list(KhorsiSimilarity.lcs(x, y))
+
+    for w1, w2 in combinations(wl, 2):
+        w1, w2 = w1.unsegmented[0], w2.unsegmented[0]
+        assert KhorsiSimilarity.lcs_bitparallel(w1, w2) == KhorsiSimilarity.lcs(w1, w2)
+
+
+def test_condensed_to_pairs():
+    n = 7
+    i, j = condensed_to_pairs(0, condensed_size(n), n)
+    assert list(zip(i.tolist(), j.tolist())) == list(combinations(range(n), 2))
+
+    i, j = condensed_to_pairs(5, 9, n)
+    assert list(zip(i.tolist(), j.tolist())) == list(combinations(range(n), 2))[5:9]
+
+
+@pytest.mark.parametrize("n_jobs,max_cells", [(1, None), (2, None), (1, 500)])
+def test_pairwise(wl, tmp_path, n_jobs, max_cells, monkeypatch):
+    if max_cells:
+        # fill the tables in many small batches of pairs of similar length
+        monkeypatch.setattr("morseg.algorithms.pairwise._MAX_CELLS", max_cells)
+    khorsi = KhorsiSimilarity(wl)
+    matrices = khorsi.pairwise(out_dir=tmp_path, n_jobs=n_jobs, block_size=500)
+
+    pairs = list(combinations(wl, 2))
+    assert matrices.sca_ned is None
+    assert len(matrices.khorsi) == len(matrices.ned) == len(pairs)
+    assert (tmp_path / "khorsi.npy").exists()
+
+    for k, (w1, w2) in enumerate(pairs):
+        assert matrices.khorsi[k] == pytest.approx(khorsi.similarity(w1, w2))
+        assert matrices.ned[k] == pytest.approx(edit_distance(w1.unsegmented[0], w2.unsegmented[0]))
+
+
+def test_pairwise_sound_classes(wl, tmp_path):
+    lingpy = pytest.importorskip("lingpy")
+    from lingpy.align.pairwise import edit_dist
+
+    words = WordlistWrapper(wl[:20])
+    matrices = KhorsiSimilarity(words).pairwise(out_dir=tmp_path, sound_classes="sca")
+
+    for k, (w1, w2) in enumerate(combinations(words, 2)):
+        expected = edit_dist(lingpy.tokens2class(w1.unsegmented[0], "sca"),
+                             lingpy.tokens2class(w2.unsegmented[0], "sca"), normalized=True)
+        assert matrices.sca_ned[k] == pytest.approx(expected)
+
+
+def test_similarity(wl):
+    khorsi = KhorsiSimilarity(wl)
+    w1, w2 = wl[0], wl[1]
+
+    assert khorsi.similarity(w1, w2) == pytest.approx(khorsi.similarity(w2, w1))
+    # a word is more similar to itself than to any other word
+    assert all(khorsi.similarity(w1, w1) > khorsi.similarity(w1, w) for w in wl[1:])
+
+
+@pytest.mark.parametrize("k", [1, 5, 100])
+def test_most_similar(wl, k):
+    khorsi = KhorsiSimilarity(wl)
+
+    for word in wl[:20]:
+        expected = sorted(((khorsi.similarity(word, other), i) for i, other in enumerate(wl) if other is not word),
+                          key=lambda x: (-x[0], x[1]))[:k]
+        result = khorsi.most_similar(word, k=k)
+
+        assert len(result) == min(k, len(wl) - 1)
+        assert [w for w, _ in result] == [wl[i] for _, i in expected]
+        assert [s for _, s in result] == pytest.approx([s for s, _ in expected])
+
+
+def test_most_similar_batch(wl):
+    khorsi = KhorsiSimilarity(wl)
+    words = wl[:10]
+
+    expected = [khorsi.most_similar(word, k=3) for word in words]
+    assert khorsi.most_similar_batch(words, k=3) == expected
+    assert [[str(w) for w, _ in r] for r in khorsi.most_similar_batch(words, k=3, n_jobs=2, chunk_size=3)] == \
+           [[str(w) for w, _ in r] for r in expected]
+
+
+def test_most_similar_unseen_segments(wl):
+    khorsi = KhorsiSimilarity(wl)
+    frequencies = dict(khorsi.frequencies)
+    # a word that is not in the list, with segments that do not occur in it
+    word = WordWrapper([list(wl[0].unsegmented[0]) + ["§", "¤"]])
+
+    expected = sorted(((khorsi.similarity(word, other), i) for i, other in enumerate(wl)),
+                      key=lambda x: (-x[0], x[1]))[:5]
+    result = khorsi.most_similar(word, k=5)
+    assert [w for w, _ in result] == [wl[i] for _, i in expected]
+    assert [s for _, s in result] == pytest.approx([s for s, _ in expected])
+
+    assert khorsi.most_similar_batch([word, wl[1]], k=5)[0] == result
+    # the frequencies of the wordlist are not changed by the queries
+    assert dict(khorsi.frequencies) == frequencies
@@ -0,0 +1,38 @@
+import pytest
+
+from morseg.algorithms.sweep import sweep_lsv
+from morseg.utils.wrappers import WordlistWrapper
+
+
+@pytest.fixture
+def wl(test_data):
+    return WordlistWrapper.from_file(test_data / "german.tsv")
+
+
+def test_sweep_lsv(wl):
+    results = sweep_lsv(wl, thresholds=[2, 3])
+
+    # 4 methods x (peak, rise, 2 thresholds) + subword, for three models
+    assert len(results) == 3 * (4 * 4 + 1)
+    scores = {(r.model, r.method, r.strategy, r.threshold): r.f1 for r in results}
+
+    # the scores match those of separately trained models
+    assert scores[("LSV", "type", "peak", None)] == pytest.approx(0.6721, abs=0.001)
+    assert scores[("LSV", "type", "rise", None)] == pytest.approx(0.6964, abs=0.001)
+    assert scores[("LSV", "type", "threshold", 2)] == pytest.approx(0.3373, abs=0.001)
+    assert scores[("LPV", "type", "peak", None)] == pytest.approx(0.7660, abs=0.001)
+    assert scores[("LSPV", "type", "peak", None)] == pytest.approx(0.6918, abs=0.001)
+    assert scores[("LSPV", "entropy", "peak", None)] == pytest.approx(0.6522, abs=0.001)
+    assert scores[("LSPV", "max_drop", "peak", None)] == pytest.approx(0.6164, abs=0.001)
+    assert scores[("LSPV", "normalized", "peak", None)] == pytest.approx(0.5143, abs=0.001)
+    assert scores[("LSPV", None, "subword", None)] == pytest.approx(0.8037, abs=0.001)
+
+    # the input wordlist is left unsegmented
+    assert wl.f1_score() == (0, 0, 0)
+
+
+def test_sweep_lsv_invalid_parameters(wl):
+    with pytest.raises(ValueError):
+        sweep_lsv(wl, strategies=["threshold"])
+    with pytest.raises(ValueError):
+        sweep_lsv(wl, methods=["foo"])
@@ -1,6 +1,12 @@
+import collections
+import json
+
 import pytest
 
 from morseg.algorithms.tokenizer import *
+from morseg.utils.callbacks import AlphabetSize, Callback, EarlyStopping, F1Score, StopTraining
+from morseg.utils.checkpoint import Checkpointer, load_checkpoint
+from morseg.utils.instrumentation import TrainingStats
 from morseg.utils.wrappers import WordlistWrapper
 
 
@@ -23,12 +29,63 @@ def test_wordpiece(wl):
     assert model.forms.f1_score()[0] == pytest.approx(0.4655, abs=0.001)
 
 
+@pytest.mark.parametrize("model_cls,kwargs", [
+    (PairEncoding, {"threshold": 3}),
+    (WordPiece, {"threshold": 0.05}),
+    (WordPiece, {"threshold": 0.05, "wp_prefix": None})
+])
+def test_merge_tokenizers_parallel(wl, model_cls, kwargs):
+    reference = model_cls()
+    reference.train(wl, iterations=100, **kwargs)
+
+    # the pairs are counted by worker processes that keep their shard of the forms over all iterations
+    model = model_cls()
+    model.train(wl, iterations=100, n_jobs=3, **kwargs)
+    assert model.merges == reference.merges
+    assert list(model.get_segmentations()) == list(reference.get_segmentations())
+
+
 def test_unigram(wl):
     model = UnigramSentencePiece()
     model.train(wl, vocab_size=20, count_single_characters=False)
     assert model.forms.f1_score()[0] == pytest.approx(0.3596, abs=0.001)
 
 
+def initial_vocabulary(wl, **kwargs):
+    model = UnigramSentencePiece()
+    model.training_data = wl
+    model.vocab = collections.Counter()
+    return model._create_ngrams(**kwargs)
+
+
+def test_unigram_initial_vocabulary(wl):
+    reference = initial_vocabulary(wl)
+    # the vocabulary is counted in the same order, so that ties are resolved alike
+    assert list(initial_vocabulary(wl, max_entries=100).items()) == list(reference.items())
+    assert list(initial_vocabulary(wl, n_jobs=2).items()) == list(reference.items())
+
+    seeded = initial_vocabulary(wl, max_entries=100, seed_vocab_size=50)
+    assert len([x for x in seeded if len(x) > 1]) == 50
+    assert {x for x in seeded if len(x) == 1} == {x for x in reference if len(x) == 1}
+    assert min(seeded[x] for x in seeded if len(x) > 1) >= sorted(
+        (count for x, count in reference.items() if len(x) > 1), reverse=True)[49]
+
+    model = UnigramSentencePiece()
+    model.train(wl, vocab_size=20, max_entries=100, seed_vocab_size=100)
+    assert model.forms.f1_score()[0] > 0.3
+
+
+@pytest.mark.parametrize("max_entries", [50, 1000])
+def test_unigram_out_of_core(wl, max_entries):
+    reference = UnigramSentencePiece()
+    reference.train(wl, vocab_size=20)
+    model = UnigramSentencePiece()
+    model.train(wl, vocab_size=20, max_entries=max_entries)
+
+    assert list(model.vocab.items()) == list(reference.vocab.items())
+    assert list(model.get_segmentations()) == list(reference.get_segmentations())
+
+
 def test_morfessor(wl):
     model = Morfessor()
     model.train(wl)
@@ -47,6 +104,22 @@ def test_lspv(wl):
     assert model.forms.f1_score()[0] == pytest.approx(0.6918, abs=0.001)
 
 
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_lspv_submodels(wl, n_jobs):
+    lsv = LSVTokenizer(method="type", strategy="peak")
+    model = LSPVTokenizer(method="type", strategy="peak", lsv=lsv)
+    model.train(wl, n_jobs=n_jobs)
+
+    # the sub-models keep their own segmentations, as if they were trained on their own
+    for sub_model, cls in [(model.lsv, LSVTokenizer), (model.lpv, LPVTokenizer)]:
+        standalone = cls(method="type", strategy="peak")
+        standalone.train(wl)
+        assert sub_model.forms is not model.forms
+        assert list(sub_model.get_segmentations()) == list(standalone.get_segmentations())
+
+    assert model.lsv is lsv
+
+
 def test_lsv(wl):
     model = LSVTokenizer(method="type", strategy="peak")
     model.train(wl)
@@ -88,3 +161,303 @@ def test_sqentr(wl):
     model.train(wl)
     assert model.forms.f1_score()[0] == pytest.approx(0.5299, abs=0.001)
 
+
+def test_segmentation_cache(wl):
+    model = LSVTokenizer(method="type", strategy="peak")
+    model.train(wl)
+    assert model.cache_info() is None
+
+    model.enable_cache(maxsize=2)
+    word = wl[0].unsegmented
+    segmented = model(word)
+    assert segmented == tuple(tuple(m) for m in model.forms[word])
+    assert model(word) is segmented
+    assert model.cache_info()[:2] == (1, 1)
+
+    for form in wl[1:4]:
+        model(form.unsegmented)
+    assert model.cache_info().evictions == 2
+
+    model.train(wl)
+    assert model.cache_info().currsize == 0
+
+
+@pytest.mark.parametrize("model", [LSVTokenizer(), SquareEntropyTokenizer(), UnigramSentencePiece()])
+def test_tokenize_batch(wl, model):
+    model.train(wl)
+    words = [form.unsegmented for form in wl]
+    assert list(model.tokenize_batch(iter(words), n_jobs=2, chunk_size=7)) == list(model.tokenize(words))
+
+
+@pytest.mark.parametrize("model,kwargs", [
+    (PairEncoding(), {"iterations": 50}),
+    (WordPiece(), {"threshold": 0.05, "iterations": 50}),
+    (UnigramSentencePiece(), {"vocab_size": 20}),
+    (Morfessor(), {}),
+    (LSVTokenizer(method="entropy", strategy="peak"), {}),
+    (LPVTokenizer(method="normalized", strategy="rise"), {}),
+    (LSPVTokenizer(strategy="subword"), {}),
+    (SquareEntropyTokenizer(), {}),
+])
+def test_save_and_load(wl, tmp_path, model, kwargs):
+    model.train(wl, **kwargs)
+    model.save(tmp_path / "model.json.gz")
+    loaded = Tokenizer.load(tmp_path / "model.json.gz")
+
+    assert type(loaded) is type(model)
+    assert len(loaded.forms) == 0
+    for form in wl:
+        assert [list(m) for m in loaded(form.unsegmented)] == [list(m) for m in model(form.unsegmented)]
+
+    # unseen words are segmented as well
+    assert loaded(Word([["h", "a", "n", "t", "ə", "n"]])) is not None
+
+    with pytest.raises(ValueError):
+        RandomTokenizer.load(tmp_path / "model.json.gz")
+
+
+def test_training_stats(wl, tmp_path):
+    model = PairEncoding()
+    model.train(wl, iterations=20, threshold=0)
+    assert model.training_stats is None
+
+    model.train(wl, iterations=20, threshold=0, instrument=True)
+    stats = model.training_stats
+    assert list(stats.phases) == ["copy_forms", "preprocess", "train", "postprocess"]
+    assert all(phase.wall >= 0 and phase.cpu >= 0 and phase.peak_memory >= 0 for phase in stats.phases.values())
+    assert len(stats.phases["train"].iterations) == len(model.merges)
+    assert stats.phases["train"].throughput()["merges/s"] > 0
+    assert stats.phases["train"].throughput()["words/s"] > 0
+
+    stats.to_json(tmp_path / "stats.json")
+    data = json.loads((tmp_path / "stats.json").read_text())
+    assert [phase["name"] for phase in data["phases"]] == list(stats.phases)
+    assert data["phases"][2]["num_iterations"] == len(model.merges)
+
+    # memory tracing can be switched off
+    model = LSVTokenizer()
+    model.train(wl, instrument=TrainingStats(trace_memory=False))
+    assert model.training_stats.phases["train"].peak_memory is None
+    assert model.training_stats.phases["train"].iterations == []
+
+
+def test_callbacks(wl):
+    model = PairEncoding()
+    model.train(wl, iterations=23, threshold=0, callbacks=[AlphabetSize(), F1Score(interval=5)])
+    history = model.training_history
+
+    assert len(model.merges) == 23
+    assert history["alphabet_size_iteration"] == list(range(1, 24))
+    # the last iteration is always evaluated
+    assert history["f1_iteration"] == [5, 10, 15, 20, 23]
+    assert history["f1"][-1] == pytest.approx(model.forms.f1_score()[0])
+
+
+@pytest.mark.parametrize("background", [None, "thread", "process"])
+def test_callbacks_sample(wl, background):
+    callback = F1Score(interval=2, sample_size=10, seed=1, background=background)
+    model = WordPiece()
+    model.train(wl, iterations=10, callbacks=[callback])
+
+    assert len(callback.forms) == 10
+    assert model.training_history["f1_iteration"] == [2, 4, 6, 8, 10]
+
+    reference = WordPiece()
+    reference.train(wl, iterations=10, callbacks=[F1Score(interval=2, sample_size=10, seed=1)])
+    assert model.training_history == reference.training_history
+
+
+def test_early_stopping(wl):
+    model = PairEncoding()
+    with pytest.raises(StopTraining):
+        model.train(wl, iterations=200, threshold=0, callbacks=[EarlyStopping(interval=5, patience=2)])
+    scores = model.training_history["f1"]
+    assert len(scores) > 2
+    assert max(scores[-2:]) <= max(scores[:-2])
+
+    model = PairEncoding()
+    with pytest.raises(StopTraining):
+        model.train(wl, iterations=200, threshold=0, callbacks=[EarlyStopping(interval=5, min_f1=0.9, grace_period=10)])
+    assert model.training_history["f1_iteration"] == [5, 10]
+
+    # training that ends on its own is never stopped
+    model = PairEncoding()
+    model.train(wl, iterations=12, threshold=0, callbacks=[EarlyStopping(interval=5, min_f1=0.9, grace_period=12)])
+    assert model.training_history["f1_iteration"] == [5, 10, 12]
+
+
+class _Abort(Callback):
+    def evaluate(self, model, iteration, **logs):
+        raise KeyboardInterrupt
+
+
+@pytest.mark.parametrize("background", ["thread", "process"])
+def test_callbacks_closed_on_error(wl, background):
+    callback = F1Score(interval=2, background=background)
+    model = PairEncoding()
+    with pytest.raises(KeyboardInterrupt):
+        model.train(wl, iterations=10, threshold=0, callbacks=[callback, _Abort(interval=5)])
+    assert callback._executor is None
+    assert callback._pending == []
+
+    callback = F1Score(interval=2, background=background)
+    with pytest.raises(StopTraining):
+        PairEncoding().train(wl, iterations=200, threshold=0,
+                             callbacks=[callback, EarlyStopping(interval=5, patience=2)])
+    assert callback._executor is None
+
+
+def test_unigram_callbacks(wl):
+    model = UnigramSentencePiece()
+    model.train(wl, vocab_size=20, callbacks=["alphabet_size", F1Score(interval=3)])
+
+    assert len(model.training_history["alphabet_size"]) > 0
+    assert model.training_history["f1"][-1] == pytest.approx(model.forms.f1_score()[0])
+
+
+class Interrupt(Callback):
+    """
+    Simulate a crash of the training process.
+    """
+    def evaluate(self, model, iteration, **logs):
+        raise KeyboardInterrupt
+
+
+@pytest.mark.parametrize("model_cls,kwargs", [
+    (PairEncoding, {"iterations": 40, "threshold": 0}),
+    (WordPiece, {"iterations": 40}),
+    (UnigramSentencePiece, {"vocab_size": 20, "percent_to_remove": 0.02}),
+])
+def test_checkpoint_and_resume(wl, tmp_path, model_cls, kwargs):
+    reference = model_cls()
+    reference.train(wl, callbacks=["alphabet_size"], **kwargs)
+
+    model = model_cls()
+    with pytest.raises(KeyboardInterrupt):
+        model.train(wl, checkpoint_dir=tmp_path, checkpoint_interval=2,
+                    callbacks=["alphabet_size", Interrupt(interval=5)], **kwargs)
+    assert load_checkpoint(tmp_path)["iteration"] == 4
+
+    resumed = model_cls()
+    resumed.train(None, resume_from=tmp_path, callbacks=["alphabet_size"])
+    assert [str(f) for f in resumed.forms] == [str(f) for f in reference.forms]
+    assert resumed.training_history == reference.training_history
+    if model_cls is not UnigramSentencePiece:
+        assert resumed.merges == reference.merges
+
+    # resuming a finished run does not continue training
+    finished = model_cls()
+    finished.train(None, resume_from=tmp_path)
+    assert [str(f) for f in finished.forms] == [str(f) for f in reference.forms]
+
+
+@pytest.mark.parametrize("model_cls,kwargs", [
+    (PairEncoding, {"threshold": 0}),
+    (WordPiece, {}),
+])
+def test_trajectory(wl, model_cls, kwargs):
+    model = model_cls()
+    model.train(wl, iterations=30, **kwargs)
+    points = model.trajectory([0, 5, 17, 30])
+    assert [point.num_merges for point in points] == [0, 5, 17, 30]
+    assert [str(f) for f in points[-1].forms] == [str(f) for f in model.forms]
+    assert all(len(f) == len(f.unsegmented.key) for f in points[0].forms)
+
+    for point in points[1:3]:
+        reference = model_cls()
+        reference.train(wl, iterations=point.num_merges, **kwargs)
+        assert [str(f) for f in point.forms] == [str(f) for f in reference.forms]
+        assert point.f1 == reference.forms.f1_score()[0]
+        assert point.alphabet_size == model.alphabet_sizes[point.num_merges - 1]
+
+    vocab_size = model.alphabet_sizes[9]
+    point = model.trajectory(vocab_sizes=[vocab_size])[0]
+    assert point.num_merges == model.num_merges_for_vocab_size(vocab_size)
+    assert point.alphabet_size == vocab_size
+    assert model.at_merges(point.num_merges).forms.f1_score() == point.forms.f1_score()
+
+    with pytest.raises(ValueError):
+        model.at_merges(31)
+
+
+def test_resume_wrong_model(wl, tmp_path):
+    PairEncoding().train(wl, iterations=3, checkpoint_dir=tmp_path)
+    with pytest.raises(ValueError):
+        WordPiece().train(None, resume_from=tmp_path)
+
+
+@pytest.mark.parametrize("model_cls", [LSVTokenizer, LPVTokenizer, LSPVTokenizer, SquareEntropyTokenizer, Morfessor])
+@pytest.mark.parametrize("kwargs", [{"checkpoint_dir": "checkpoints"}, {"checkpoint_interval": 5},
+                                    {"checkpoint_seconds": 60}, {"resume_from": "checkpoints"}])
+def test_checkpoints_unsupported(wl, tmp_path, model_cls, kwargs):
+    kwargs = {key: tmp_path / value if isinstance(value, str) else value for key, value in kwargs.items()}
+    with pytest.raises(ValueError, match=model_cls.__name__):
+        model_cls().train(wl, **kwargs)
+    assert not (tmp_path / "checkpoints").exists()
+
+
+def test_resume_incompatible_version(wl, tmp_path):
+    PairEncoding().train(wl, iterations=3, checkpoint_dir=tmp_path)
+    checkpoint = load_checkpoint(tmp_path)
+    assert checkpoint["version"] == CHECKPOINT_VERSION
+
+    checkpoint["version"] = CHECKPOINT_VERSION + 1
+    Checkpointer(tmp_path).write(checkpoint)
+    with pytest.raises(ValueError):
+        PairEncoding().train(None, resume_from=tmp_path)
+
+
+def test_lspv_shared_training(wl):
+    model = LSPVTokenizer(method="type", strategy="peak")
+    model.train(wl, n_jobs=2)
+    assert model.forms.f1_score()[0] == pytest.approx(0.6918, abs=0.001)
+
+    serial_model = LSPVTokenizer(method="type", strategy="peak")
+    serial_model.train(wl)
+    assert list(model.get_segmentations()) == list(serial_model.get_segmentations())
+    assert model(wl[0].unsegmented) == serial_model(wl[0].unsegmented)
+
+    # the training wordlist itself is never segmented
+    assert wl.f1_score() == (0, 0, 0)
+
+
+def test_morfessor_warm_start(wl, tmp_path):
+    model = Morfessor()
+    model.train(wl)
+    model.save_model(tmp_path / "morfessor.bin")
+
+    # continuing from the saved model on the same data keeps the segmentations
+    warm_model = Morfessor()
+    warm_model.train(wl, init_model=tmp_path / "morfessor.bin", n_jobs=2)
+    assert warm_model.forms.f1_score()[0] == pytest.approx(0.8073, abs=0.001)
+
+    # the passed model object is not modified
+    base_model = Morfessor.load_model(tmp_path / "morfessor.bin")
+    Morfessor().train(WordlistWrapper(wl[:10]), init_model=base_model)
+    assert base_model.get_cost() == Morfessor.load_model(tmp_path / "morfessor.bin").get_cost()
+
+
+def test_morfessor_tokenize_batch(wl):
+    model = Morfessor()
+    model.train(wl)
+    words = [form.unsegmented for form in wl] + [Word([["h", "a", "n", "t", "ə", "n"]])] * 3
+    segmented = list(model.tokenize_batch(words, n_jobs=2, chunk_size=8))
+    assert segmented[:len(wl)] == [Word(form) for form in model.forms]
+    assert segmented[-1] == model(words[-1])
+
+
+def test_morfessor_online(wl, test_data, tmp_path):
+    model = Morfessor()
+    forms = WordlistWrapper.iter_file(test_data / "german.tsv")
+    model.train_online(forms, epoch_interval=10, checkpoint_dir=tmp_path)
+    assert (tmp_path / "morfessor.bin").exists()
+    assert len(model.forms) == 0
+
+    for form, segmented in zip(wl, model.tokenize_batch(wl.unsegmented())):
+        form.update(segmented)
+    assert wl.f1_score()[0] == pytest.approx(0.8148, abs=0.001)
+
+    # resume from the checkpoint
+    resumed = Morfessor()
+    resumed.train_online(iter([]), init_model=tmp_path / "morfessor.bin")
+    assert resumed(wl[0].unsegmented) == model(wl[0].unsegmented)
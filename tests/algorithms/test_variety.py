@@ -0,0 +1,52 @@
+import pytest
+
+from morseg.algorithms.tokenizer import LSVTokenizer, LPVTokenizer
+from morseg.algorithms.sweep import sweep_lsv
+from morseg.algorithms.variety import PackedVarieties, get_splits
+from morseg.utils.wrappers import WordlistWrapper
+
+
+@pytest.fixture
+def wl(test_data):
+    return WordlistWrapper.from_file(test_data / "german.tsv")
+
+
+def test_packed_varieties():
+    packed = PackedVarieties([[[2, 1], [3], [0]], [[4, 4]]])
+    assert packed.type_variety().tolist() == [2, 1, 1, 2]
+    assert packed.successor_max_drop().tolist() == [1 - 2 / 3, 0.0, 0.0, 0.5]
+    assert packed.successor_entropy().tolist()[1:] == [0.0, 0.0, 1.0]
+    assert packed.expected_type_variety().tolist() == [2.0, 1.0, 1.0]
+    assert packed.to_lists(packed.type_variety()) == [[2, 1, 1], [2]]
+
+
+def test_get_splits():
+    packed = PackedVarieties([[[1], [1, 1, 1], [1], [1, 1], [1]]])
+    matrix = packed.to_matrix(packed.type_variety())
+    assert get_splits(matrix, packed.lengths, "peak") == [[1, 3]]
+    assert get_splits(matrix, packed.lengths, "rise") == [[1, 3]]
+    assert get_splits(matrix, packed.lengths, "threshold", threshold=2) == [[1]]
+
+
+@pytest.mark.parametrize("model_cls", [LSVTokenizer, LPVTokenizer])
+@pytest.mark.parametrize("method", LSVTokenizer.param_options["method"])
+@pytest.mark.parametrize("strategy,threshold", [("peak", None), ("rise", None), ("threshold", 0.5)])
+def test_numpy_backend(wl, model_cls, method, strategy, threshold):
+    python_model = model_cls(method=method, strategy=strategy, threshold=threshold)
+    python_model.train(wl)
+    numpy_model = model_cls(method=method, strategy=strategy, threshold=threshold, backend="numpy")
+    numpy_model.train(wl)
+
+    assert numpy_model.varieties == python_model.varieties
+    assert list(numpy_model.get_segmentations()) == list(python_model.get_segmentations())
+
+
+def test_numpy_backend_sweep(wl):
+    python_results = sweep_lsv(wl, thresholds=[2])
+    numpy_results = sweep_lsv(wl, thresholds=[2], backend="numpy")
+    assert [r.f1 for r in numpy_results] == [r.f1 for r in python_results]
+
+
+def test_invalid_backend():
+    with pytest.raises(ValueError):
+        LSVTokenizer(backend="fortran")
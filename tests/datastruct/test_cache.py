@@ -0,0 +1,26 @@
+from morseg.datastruct import LRUCache
+
+import pytest
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    assert cache.get("c") is None
+
+    # "b" is the least recently used entry and gets evicted
+    cache["c"] = 3
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.info() == (1, 1, 1, 2, 2)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.info().hits == 1
+
+
+def test_lru_cache_invalid_size():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
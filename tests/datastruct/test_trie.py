@@ -323,3 +323,15 @@ def test_get_subwords(trie, words):
     assert ["b", "i", "g"] in trie.get_subwords(w)
 
     assert ["b", "i", "g"] in trie.get_subwords(Word(["b", "i", "g", "p"]))
+
+
+def test_to_dict(trie, words):
+    trie.insert_all(words)
+    restored = Trie.from_dict(trie.to_dict())
+
+    assert restored == trie
+    for word in words:
+        assert restored.get_token_variety(word) == trie.get_token_variety(word)
+
+    reverse_trie = Trie(words, reverse=True)
+    assert Trie.from_dict(reverse_trie.to_dict()).reverse
@@ -0,0 +1,29 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+# upper bound (in seconds) for importing the tokenizers in a fresh interpreter, just above the measured ~60ms
+IMPORT_TIME_BUDGET = 0.15
+
+HEAVY_MODULES = ["tqdm", "morfessor", "numpy", "matplotlib", "lingpy", "concurrent.futures"]
+
+
+def _run(code):
+    env = dict(os.environ)
+    src = str(pathlib.Path(__file__).parent.parent / "src")
+    env["PYTHONPATH"] = os.pathsep.join([src, env.get("PYTHONPATH", "")])
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+
+
+def test_import_time():
+    code = ("import time; start = time.perf_counter(); import morseg.algorithms.tokenizer; "
+            "print(time.perf_counter() - start)")
+    # take the best of a few runs to be robust against a cold file system cache
+    assert min(float(_run(code)) for _ in range(3)) < IMPORT_TIME_BUDGET
+
+
+def test_optional_dependencies_are_not_imported():
+    code = ("import sys, morseg.algorithms.tokenizer, morseg.algorithms.similarity; "
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    assert _run(code).split() == []
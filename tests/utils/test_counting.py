@@ -0,0 +1,47 @@
+import collections
+import random
+
+import pytest
+
+from morseg.utils.counting import count_ngrams, count_unigrams, count_bigrams
+from morseg.utils.synthetic import zipf_wordlist
+
+
+def serial_ngrams(words, min_length, max_length):
+    counts = collections.Counter()
+    for word in words:
+        for i in range(len(word)):
+            for j in range(i + min_length, min(i + max_length, len(word)) + 1):
+                counts[tuple(word[i:j])] += 1
+    return counts
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_wordlist_counts(n_jobs):
+    wl = zipf_wordlist(1000)
+    wl.split_everywhere()
+
+    # same counts, in the same order
+    assert list(wl.unigram_counts(n_jobs=n_jobs).items()) == list(wl.unigram_counts().items())
+    assert list(wl.bigram_counts(n_jobs=n_jobs).items()) == list(wl.bigram_counts().items())
+    assert count_unigrams(wl, num_shards=7) == wl.unigram_counts()
+    assert count_bigrams(wl, num_shards=7) == wl.bigram_counts()
+
+
+@pytest.mark.parametrize("n_jobs", [1, 3])
+def test_count_ngrams(n_jobs):
+    rng = random.Random(0)
+    # with thousands of symbols, long n-grams cannot be encoded as 64-bit integers
+    words = [[str(rng.randrange(3000)) for _ in range(rng.randint(0, 9))] for _ in range(500)]
+    words += [list("abracadabra"), list("banana")]
+
+    expected = serial_ngrams(words, 1, 11)
+    assert list(count_ngrams(words, n_jobs=n_jobs).items()) == list(expected.items())
+
+    expected = serial_ngrams(words, 2, 7)
+    assert list(count_ngrams(words, min_length=2, max_length=7, n_jobs=n_jobs).items()) == list(expected.items())
+
+
+def test_count_ngrams_empty():
+    assert count_ngrams([]) == {}
+    assert count_ngrams([[], []], n_jobs=2) == {}
@@ -0,0 +1,59 @@
+import pytest
+
+from morseg.algorithms.tokenizer import PairEncoding, WordPiece
+from morseg.utils.evaluation import SegmentationCounts, bootstrap_scores, paired_test
+from morseg.utils.wrappers import WordlistWrapper
+
+
+@pytest.fixture
+def wl(test_data):
+    return WordlistWrapper.from_file(test_data / "german.tsv")
+
+
+@pytest.fixture
+def bpe(wl):
+    model = PairEncoding()
+    model.train(wl, threshold=3, iterations=200)
+    return model.forms
+
+
+def test_segmentation_counts(wl, bpe):
+    assert SegmentationCounts.from_forms(bpe).scores() == pytest.approx(bpe.f1_score())
+
+    model = WordPiece()
+    model.train(wl, iterations=50)
+    assert SegmentationCounts.from_forms(model.training_data, ignore_token="##").scores() == pytest.approx(
+        model.training_data.f1_score(ignore_token="##"))
+
+
+def test_bootstrap_scores(bpe):
+    result = bootstrap_scores(bpe, num_samples=500, chunk_size=100)
+    for interval, estimate in zip(result, bpe.f1_score()):
+        assert interval.estimate == pytest.approx(estimate)
+        assert interval.low < estimate < interval.high
+
+    # reproducible, regardless of the number of processes
+    assert bootstrap_scores(bpe, num_samples=500, chunk_size=100, n_jobs=2) == result
+    assert bootstrap_scores(bpe, num_samples=500, chunk_size=100, seed=1) != result
+
+    narrow = bootstrap_scores(bpe, num_samples=500, confidence=0.5)
+    assert narrow.f1.high - narrow.f1.low < result.f1.high - result.f1.low
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "permutation"])
+def test_paired_test(wl, bpe, method):
+    unsegmented = wl.copy()
+    result = paired_test(bpe, unsegmented, method=method, num_samples=200)
+    assert result.difference == pytest.approx(bpe.f1_score()[0])
+    assert result.p_value < 0.01
+
+    same = paired_test(bpe, bpe.copy(), method=method, num_samples=200)
+    assert same.difference == 0
+    assert same.p_value == 1.0
+
+
+def test_paired_test_different_words(wl, bpe):
+    with pytest.raises(ValueError):
+        paired_test(bpe, WordlistWrapper(list(wl)[1:] + list(wl)[:1]))
+    with pytest.raises(ValueError):
+        paired_test(bpe, bpe, metric="accuracy")
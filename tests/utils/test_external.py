@@ -0,0 +1,68 @@
+import collections
+import os
+import random
+
+import pytest
+
+from morseg.utils.external import ExternalCounter, count_ngrams_external, count_bigrams_external, most_frequent
+from morseg.utils.wrappers import WordlistWrapper, form_key
+
+
+@pytest.fixture
+def words():
+    rng = random.Random(0)
+    return [[rng.choice("abcdefgh") for _ in range(rng.randint(1, 8))] for _ in range(300)]
+
+
+def test_external_counter(tmp_path):
+    rng = random.Random(1)
+    keys = [rng.randrange(500) for _ in range(5000)]
+
+    with ExternalCounter(max_entries=50, directory=tmp_path, max_open_files=3) as counter:
+        counter.update(keys)
+        assert len(counter.counts) < 50
+        assert len(counter.runs) > 3
+        items = list(counter.items())
+
+    assert items == sorted(collections.Counter(keys).items())
+
+    with ExternalCounter(max_entries=50, directory=tmp_path, max_open_files=3) as counter:
+        counter.update(keys)
+        items = list(counter.items(order="first"))
+        with pytest.raises(ValueError):
+            list(counter.items(order="count"))
+
+    assert items == list(collections.Counter(keys).items())
+    # the temporary files are deleted
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("max_entries", [10, 10 ** 6])
+def test_count_ngrams_external(words, max_entries):
+    expected = collections.Counter()
+    for word in words:
+        for i in range(len(word)):
+            for j in range(i + 1, min(i + 3, len(word)) + 1):
+                expected[tuple(word[i:j])] += 1
+
+    result = list(count_ngrams_external(words, max_length=3, max_entries=max_entries))
+    assert result == list(expected.items())
+
+    bigrams = dict(count_bigrams_external(iter(words), max_entries=max_entries))
+    assert bigrams == {ngram: count for ngram, count in expected.items() if len(ngram) == 2}
+
+
+def test_streaming_corpus(test_data):
+    words = (form_key(form) for form in WordlistWrapper.iter_file(test_data / "german.tsv"))
+    counts = dict(count_ngrams_external(words, max_length=1, max_entries=5))
+
+    wl = WordlistWrapper.from_file(test_data / "german.tsv")
+    assert sum(counts.values()) >= sum(len(form.unsegmented.key) for form in wl)
+    assert set(counts) == {(segment,) for form in wl for segment in form.unsegmented.key}
+
+
+def test_most_frequent():
+    items = [("a", 1), ("b", 5), ("c", 3), ("d", 5), ("e", 2)]
+    assert most_frequent(iter(items), 2) == {"b": 5, "d": 5}
+    assert most_frequent(iter(items), 1, keep=lambda key: key == "a") == {"a": 1, "b": 5}
+    assert most_frequent(iter(items), 0) == {}
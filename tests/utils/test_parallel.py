@@ -0,0 +1,75 @@
+from morseg.utils.parallel import (chunked, imap_chunks, resolve_n_jobs, set_worker_state, get_worker_state,
+                                   ShardedWorkers)
+
+import os
+import pytest
+
+
+def _scale_chunk(chunk):
+    factor = get_worker_state("factor")
+    return [factor * x for x in chunk]
+
+
+def _nested_chunk(chunk):
+    factor = get_worker_state("factor")
+    inner = imap_chunks(_scale_chunk, chunk, initializer=set_worker_state, initargs=({"factor": 10},))
+    # the inner generator does not replace the state of this task
+    return [(factor, x) for inner_chunk in inner for x in inner_chunk] + [(get_worker_state("factor"), None)]
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
+    with pytest.raises(ValueError):
+        list(chunked(range(5), 0))
+
+
+def test_resolve_n_jobs():
+    assert resolve_n_jobs(None) == 1
+    assert resolve_n_jobs(3) == 3
+    assert resolve_n_jobs(-1) == (os.cpu_count() or 1)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_imap_chunks(n_jobs):
+    results = imap_chunks(_scale_chunk, iter(range(100)), n_jobs=n_jobs, chunk_size=7,
+                          initializer=set_worker_state, initargs=({"factor": 2},))
+    assert [x for chunk in results for x in chunk] == [2 * x for x in range(100)]
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_imap_chunks_nested(n_jobs):
+    results = imap_chunks(_nested_chunk, range(4), n_jobs=n_jobs, chunk_size=2,
+                          initializer=set_worker_state, initargs=({"factor": 2},))
+    assert [x for chunk in results for x in chunk] == [(2, 0), (2, 10), (2, None), (2, 20), (2, 30), (2, None)]
+
+
+def _sleep_chunk(chunk):
+    import time
+    time.sleep(chunk[0])
+    return chunk
+
+
+def test_imap_chunks_unordered():
+    results = imap_chunks(_sleep_chunk, [0.5, 0.0, 0.0], n_jobs=2, chunk_size=1, ordered=False)
+    results = [x for chunk in results for x in chunk]
+    assert sorted(results) == [0.0, 0.0, 0.5]
+    # the slow first chunk does not hold back the others
+    assert results[-1] == 0.5
+
+
+def _append_and_sum(shard, value):
+    if value < 0:
+        raise ValueError("negative value")
+    shard.append(value)
+    return sum(shard)
+
+
+def test_sharded_workers():
+    with ShardedWorkers(_append_and_sum, [[1], [10, 20], []]) as workers:
+        # the workers keep their shards between messages
+        assert workers.map(1) == [2, 31, 1]
+        assert workers.map(2) == [4, 33, 3]
+        with pytest.raises(ValueError):
+            workers.map(-1)
+        assert workers.map(0) == [4, 33, 3]
@@ -0,0 +1,34 @@
+import pytest
+
+from morseg.utils.synthetic import zipf_wordlist
+
+
+def test_zipf_wordlist():
+    wl = zipf_wordlist(500, seed=1)
+
+    assert len(wl) == 500
+    assert len({str(w.unsegmented) for w in wl}) == 500
+    assert zipf_wordlist(500, seed=1) == wl
+    assert zipf_wordlist(500, seed=2) != wl
+
+    # the words are unsegmented, and the gold standard segmentation is a root with at most three affixes
+    assert all(len(w) == 1 for w in wl)
+    assert all(1 <= len(w.gold_segmented) <= 4 for w in wl)
+    assert any(len(w.gold_segmented) > 1 for w in wl)
+
+
+def test_zipf_wordlist_frequencies():
+    wl = zipf_wordlist(2000, num_suffixes=10, max_prefixes=0, max_suffixes=1)
+    counts = {}
+    for w in wl:
+        if len(w.gold_segmented) == 2:
+            suffix = str(w.gold_segmented[-1])
+            counts[suffix] = counts.get(suffix, 0) + 1
+
+    frequencies = sorted(counts.values(), reverse=True)
+    assert frequencies[0] > 3 * frequencies[-1]
+
+
+def test_zipf_wordlist_too_small():
+    with pytest.raises(ValueError):
+        zipf_wordlist(100, num_roots=1, num_prefixes=1, num_suffixes=1)
@@ -1,6 +1,7 @@
-from morseg.utils.wrappers import WordWrapper, WordlistWrapper
+from morseg.utils.wrappers import WordWrapper, WordlistWrapper, Form
 from linse.typedsequence import Word, Morpheme
 
+import pickle
 import pytest
 
 
@@ -98,7 +99,20 @@ def test_word_wrapper_merges_with_wp_token(w):
 
 
 def test_hash(w):
-    assert hash(w) == hash("[['t', 'e', 's', 't']]")
+    # words are hashed by their unsegmented form, so the hash does not change when the word is segmented
+    assert hash(w) == hash(Word([["t", "e", "s", "t"]]))
+    w.split(2)
+    assert hash(w) == hash(Word([["t", "e", "s", "t"]]))
+    assert w in {w.copy()}
+
+
+def test_form(w):
+    form = w.unsegmented
+    assert isinstance(form, Form)
+    assert hash(form) == hash(Word(form))
+    assert form.key == ("t", "e", "s", "t")
+    assert pickle.loads(pickle.dumps(form)) == form
+    assert {form: 1}[Word(form)] == 1
 
 
 @pytest.fixture
@@ -142,6 +156,29 @@ def test_wl_copy(wl, w):
     assert wl != wl2
 
 
+def test_wl_copy_on_write(wl):
+    wl.split_everywhere()
+    wl2 = wl.copy()
+
+    # the copies share their morphemes and annotations until they are modified
+    assert wl2[1] is not wl[1]
+    assert list.__getitem__(wl2[1], 0) is list.__getitem__(wl[1], 0)
+    assert wl2[1].gold_segmented is wl[1].gold_segmented
+
+    segmented = [str(word) for word in wl]
+    wl2.add_wp_token(wp_token="##")
+    wl2.merge(Morpheme(["ts"]), Morpheme(["##", "v"]), wp_token="##")
+    wl2.remove_wp_token(wp_token="##")
+    assert [str(word) for word in wl] == segmented
+    assert str(wl2[1]) != segmented[1]
+
+    # lookups find the words of the copy, by unsegmented form, plain word or form key
+    assert wl2[wl[1].unsegmented] is wl2[1]
+    assert wl[wl[1].unsegmented] is wl[1]
+    assert wl[Word(wl[1].unsegmented)] is wl[1]
+    assert wl[wl[1].unsegmented.key] is wl[1]
+
+
 def test_wl_merge_and_split(wl):
     wl.split_everywhere()
     wl.merge(Morpheme(["ts"]), Morpheme(["v"]))
@@ -201,3 +238,26 @@ def test_wl_f1score(wl):
     assert 0 < f1 < 0.5
 
 
+def test_pickle(w):
+    w.split(1)
+    w2 = pickle.loads(pickle.dumps(w))
+    assert w2 == w
+    assert w2.get_splits() == [1]
+    assert w2.unsegmented == w.unsegmented
+
+
+def test_iter_file(test_data, wl):
+    forms = WordlistWrapper.iter_file(test_data / "german.tsv")
+    assert not isinstance(forms, list)
+    assert WordlistWrapper(list(forms)) == wl
+
+
+def test_from_multilingual_file(test_data, tmp_path, wl):
+    lines = (test_data / "german.tsv").read_text().splitlines()
+    rows = lines[1:] + [line.replace("German", "Deutsch") for line in lines[1:11]]
+    (tmp_path / "multi.tsv").write_text("\n".join([lines[0]] + rows) + "\n")
+
+    wordlists = WordlistWrapper.from_multilingual_file(tmp_path / "multi.tsv")
+    assert list(wordlists) == ["German", "Deutsch"]
+    assert wordlists["German"] == wl
+    assert len(wordlists["Deutsch"]) == 10